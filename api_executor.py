@@ -0,0 +1,112 @@
+import re
+import sys
+import time
+import random
+import threading
+
+TRANSPORT_ERRORS = (ConnectionError, TimeoutError)
+
+# HTTP status codes worth retrying: timeouts, rate limiting and transient server errors
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """Token bucket allowing requests_per_minute requests, shared by every thread.
+
+    The bucket starts full, so a burst of up to requests_per_minute calls goes out
+    immediately; after that calls are spaced out at the configured rate.
+    """
+
+    def __init__(self, requests_per_minute):
+        self.capacity = float(requests_per_minute)
+        self.rate = requests_per_minute / 60.0  # tokens per second
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _status_code(error):
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def _retry_after(error):
+    """Returns the server-suggested delay in seconds (RetryInfo.retryDelay), if any."""
+    details = getattr(error, "details", None)
+    if not isinstance(details, dict):
+        return None
+    for detail in details.get("error", {}).get("details", []) or []:
+        delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+        if isinstance(delay, str):
+            match = re.fullmatch(r"(\d+(?:\.\d+)?)s", delay)
+            if match:
+                return float(match.group(1))
+    return None
+
+
+def is_retryable(error):
+    if isinstance(error, TRANSPORT_ERRORS):
+        return True
+    # httpx is not imported here, to keep startup fast; its errors can only exist once the client has loaded it
+    httpx = sys.modules.get("httpx")
+    if httpx is not None and isinstance(error, httpx.TransportError):
+        return True
+    return _status_code(error) in RETRYABLE_STATUS
+
+
+class RequestExecutor:
+    """Runs API calls with rate limiting and retries.
+
+    Every call first takes a token from the shared RateLimiter. Retryable failures
+    (429, 5xx, timeouts, dropped connections) are retried up to max_retries times
+    with exponential backoff and full jitter, so concurrent chunks and actions that
+    hit the quota together don't retry in lockstep. A retry delay suggested by the
+    server is honoured when it is longer.
+    """
+
+    def __init__(self, max_retries=5, base_delay=2.0, max_delay=60.0, requests_per_minute=None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limiter = RateLimiter(requests_per_minute) if requests_per_minute else None
+
+    def call(self, fn, *args, **kwargs):
+        attempt = 0
+        while True:
+            if self.limiter:
+                self.limiter.acquire()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                suggested = _retry_after(e)
+                if suggested:
+                    delay = max(delay, suggested)
+                attempt += 1
+                print(f"API call failed ({e.__class__.__name__}: {e}). Retry {attempt}/{self.max_retries} in {delay:.1f}s...")
+                time.sleep(delay)
+
+
+def executor_from_config(config):
+    """Builds a RequestExecutor from the general.api section of config.json."""
+    settings = config.get("general", {}).get("api", {})
+    return RequestExecutor(
+        max_retries=settings.get("max_retries", 5),
+        base_delay=settings.get("base_delay_seconds", 2),
+        max_delay=settings.get("max_delay_seconds", 60),
+        requests_per_minute=settings.get("requests_per_minute"),
+    )
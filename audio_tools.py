@@ -0,0 +1,201 @@
+import re
+import math
+import subprocess
+
+# Binaries used for all audio work. Both ship with the ffmpeg package (brew install ffmpeg).
+FFMPEG = "ffmpeg"
+FFPROBE = "ffprobe"
+
+# Codec name in config.json -> (ffmpeg encoder, file extension). All of them are accepted by Gemini.
+CODECS = {
+    "mp3": ("libmp3lame", ".mp3"),
+    "aac": ("aac", ".m4a"),
+    "opus": ("libopus", ".ogg"),
+    "flac": ("flac", ".flac"),
+}
+
+
+def codec_extension(codec):
+    return CODECS[codec][1]
+
+
+def _run(cmd):
+    """Runs an ffmpeg/ffprobe command and returns the completed process, raising with stderr on failure."""
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except FileNotFoundError:
+        raise RuntimeError(f"{cmd[0]} not found. Install ffmpeg (e.g. 'brew install ffmpeg') and make sure it is on PATH.")
+    if result.returncode != 0:
+        raise RuntimeError(f"{cmd[0]} failed ({result.returncode}): {result.stderr.strip()}")
+    return result
+
+
+def probe_duration(path):
+    """Returns the duration of an audio file in seconds, read from the container metadata."""
+    output = _run([
+        FFPROBE, "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        path,
+    ]).stdout
+    try:
+        return float(output.strip())
+    except ValueError:
+        raise RuntimeError(f"Could not read duration of {path} (ffprobe returned {output.strip()!r}).")
+
+
+def extract_segment(source_path, output_path, start_seconds=0, duration_seconds=None, bitrate=None,
+                    codec="mp3", channels=None, sample_rate=None):
+    """Cuts [start, start + duration) out of source_path without decoding the whole file.
+
+    The input is seeked to start before it is opened, so ffmpeg only reads the
+    requested range. Without any encoding options the audio stream is copied as-is
+    (the output should keep the source extension). Otherwise it is re-encoded with
+    codec (see CODECS), optionally downmixed to channels and resampled to sample_rate.
+    """
+    cmd = [FFMPEG, "-v", "error", "-y"]
+    if start_seconds:
+        cmd += ["-ss", f"{start_seconds:.3f}"]
+    if duration_seconds is not None:
+        cmd += ["-t", f"{duration_seconds:.3f}"]
+    cmd += ["-i", source_path, "-vn"]
+
+    if bitrate or channels or sample_rate:
+        cmd += ["-c:a", CODECS[codec][0]]
+        if bitrate:
+            cmd += ["-b:a", bitrate]
+        if channels:
+            cmd += ["-ac", str(channels)]
+        if sample_rate:
+            cmd += ["-ar", str(sample_rate)]
+    else:
+        cmd += ["-c:a", "copy"]
+
+    # Identical input gives identical bytes (e.g. no random Ogg stream serial), so the
+    # result cache, which is keyed by file content, also hits for re-encoded audio
+    cmd += ["-fflags", "+bitexact", "-flags:a", "+bitexact"]
+    cmd.append(output_path)
+    _run(cmd)
+    return output_path
+
+
+def detect_silences(path, start_seconds, duration_seconds, noise_db=-35, min_silence_seconds=0.5):
+    """Returns the (start, end) times in seconds of silent stretches within a window of the file.
+
+    Only the window is decoded, so this stays cheap on multi-hour recordings.
+    """
+    result = _run([
+        FFMPEG, "-hide_banner", "-nostats",
+        "-ss", f"{start_seconds:.3f}", "-t", f"{duration_seconds:.3f}",
+        "-i", path, "-vn",
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_silence_seconds}",
+        "-f", "null", "-",
+    ])
+    # Reported times are relative to the seeked start of the window
+    starts = [float(v) for v in re.findall(r"silence_start: (-?[\d.]+)", result.stderr)]
+    ends = [float(v) for v in re.findall(r"silence_end: ([\d.]+)", result.stderr)]
+    if len(ends) < len(starts):
+        # Silence runs to the end of the window
+        ends.append(duration_seconds)
+    return [(start_seconds + max(0.0, s), start_seconds + e) for s, e in zip(starts, ends)]
+
+
+def find_cut_point(path, target_seconds, search_seconds=60, noise_db=-35, min_silence_seconds=0.5):
+    """Returns the middle of the silence closest to target_seconds, or target_seconds if there is none."""
+    window_start = max(0.0, target_seconds - search_seconds / 2)
+    silences = detect_silences(path, window_start, search_seconds, noise_db, min_silence_seconds)
+    if not silences:
+        return target_seconds
+    middles = [(start + end) / 2 for start, end in silences]
+    return min(middles, key=lambda middle: abs(middle - target_seconds))
+
+
+def find_speech_bounds(path, duration_seconds, window_seconds=120, noise_db=-35, min_silence_seconds=0.5):
+    """Returns (start, end) in seconds with leading and trailing silence trimmed off.
+
+    Only the first and last window_seconds of the file are decoded.
+    """
+    window_seconds = min(window_seconds, duration_seconds)
+    start, end = 0.0, duration_seconds
+
+    leading = detect_silences(path, 0, window_seconds, noise_db, min_silence_seconds)
+    if leading and leading[0][0] <= 0.1:
+        start = leading[0][1]
+
+    trailing = detect_silences(path, duration_seconds - window_seconds, window_seconds, noise_db, min_silence_seconds)
+    if trailing and trailing[-1][1] >= duration_seconds - 0.1:
+        end = trailing[-1][0]
+
+    if end <= start:
+        # Nothing but silence; leave the file alone
+        return 0.0, duration_seconds
+    return start, end
+
+
+def choose_chunking(duration_seconds, policy="balanced", parallelism=1, max_chunk_seconds=50 * 60,
+                    min_chunk_seconds=10 * 60, split_threshold_seconds=60 * 60):
+    """Decides how many chunks to cut a recording into, and how long each one is.
+
+    Policies:
+      - "fixed": the original behaviour. Recordings over split_threshold_seconds
+        are cut into max_chunk_seconds pieces, and the last piece is the remainder.
+      - "balanced": same chunk count as "fixed", but all chunks have equal length.
+      - "parallel": picks the chunk count that minimizes wall-clock time when
+        chunks are transcribed parallelism at a time. Chunks never exceed
+        max_chunk_seconds (the model's input limit) and are not made shorter than
+        min_chunk_seconds. Recordings under the split threshold are split too,
+        as long as the chunks stay long enough.
+
+    Returns (num_chunks, chunk_seconds).
+    """
+    min_chunks = max(1, math.ceil(duration_seconds / max_chunk_seconds))
+
+    if policy == "fixed":
+        if duration_seconds <= split_threshold_seconds:
+            return 1, duration_seconds
+        return min_chunks, max_chunk_seconds
+
+    if policy == "parallel":
+        parallelism = max(1, int(parallelism))
+        max_chunks = max(min_chunks, int(duration_seconds // min_chunk_seconds))
+        # Chunks run in ceil(n / parallelism) waves of duration / n each; prefer fewer chunks on ties
+        num_chunks = min(
+            range(min_chunks, max_chunks + 1),
+            key=lambda n: (round(math.ceil(n / parallelism) * duration_seconds / n, 3), n),
+        )
+        return num_chunks, duration_seconds / num_chunks
+
+    if policy != "balanced":
+        print(f"Warning: Unknown chunking policy '{policy}', using 'balanced'.")
+    if duration_seconds <= split_threshold_seconds:
+        return 1, duration_seconds
+    return min_chunks, duration_seconds / min_chunks
+
+
+def plan_chunks(path, duration_seconds, num_chunks, chunk_seconds, overlap_seconds=0, silence_search_seconds=0,
+                noise_db=-35, min_silence_seconds=0.5, start_seconds=0.0):
+    """Splits duration_seconds of a recording, from start_seconds on, into num_chunks chunks of about chunk_seconds.
+
+    Each cut is moved to the nearest silence in a silence_search_seconds window
+    around its nominal position, so words are not split. Every chunk after the first also
+    starts overlap_seconds early, giving the model some context and a margin for
+    the caption merge.
+
+    Returns a list of (start, end, keep_from) tuples in seconds: the chunk is cut
+    from start to end, and its captions are authoritative from keep_from onwards
+    (keep_from is the cut point; the part before it belongs to the previous chunk).
+    """
+    cuts = [start_seconds]
+    for i in range(1, num_chunks):
+        target = start_seconds + i * chunk_seconds
+        if silence_search_seconds:
+            target = find_cut_point(path, target, silence_search_seconds, noise_db, min_silence_seconds)
+        cuts.append(target)
+    cuts.append(start_seconds + duration_seconds)
+
+    chunks = []
+    for i in range(num_chunks):
+        keep_from = cuts[i]
+        start = max(start_seconds, keep_from - overlap_seconds)
+        chunks.append((start, cuts[i + 1], keep_from))
+    return chunks
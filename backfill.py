@@ -0,0 +1,175 @@
+import os
+import sys
+import glob
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from monitor import (
+    AUDIO_EXTENSIONS,
+    PROCESSED_DB,
+    PROCESSED_LOG,
+    load_config,
+    determine_mode_and_actions,
+    process_file,
+)
+from processed_store import ProcessedStore
+from audio_tools import probe_duration
+from watcher import SKIP_DIRS
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler()]
+)
+
+
+def find_audio_files(patterns):
+    """Expands directories (recursively) and glob patterns into a sorted list of audio files."""
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, files in os.walk(pattern):
+                dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+                found.update(os.path.join(root, f) for f in files)
+        else:
+            found.update(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p))
+    return sorted(
+        os.path.abspath(p) for p in found
+        if os.path.splitext(p)[1].lower() in AUDIO_EXTENSIONS
+    )
+
+
+def _format_seconds(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m{seconds % 60:02d}s"
+
+
+def plan_backfill(files, config, processed, mode_override=None, force=False):
+    """Returns (jobs, skipped). jobs are (filepath, mode, actions, duration), best first."""
+    modes = config.get("modes", {})
+    jobs, skipped = [], []
+    for filepath in files:
+        if mode_override:
+            mode, actions = mode_override, modes[mode_override].get("actions", [])
+        else:
+            mode, actions = determine_mode_and_actions(os.path.basename(filepath), modes)
+        if not mode:
+            skipped.append((filepath, "no matching mode"))
+            continue
+        if not force and processed.is_processed(filepath):
+            skipped.append((filepath, "already processed"))
+            continue
+        try:
+            duration = probe_duration(filepath)
+        except Exception as e:
+            logging.warning(f"Skipping unreadable file {filepath}: {e}")
+            skipped.append((filepath, "unreadable"))
+            continue
+        jobs.append((filepath, mode, actions, duration))
+
+    # Same order as the monitor's queue: mode priority, then shortest first
+    jobs.sort(key=lambda job: (-modes[job[1]].get("priority", 0), job[3]))
+    return jobs, skipped
+
+
+def _stat(filepath):
+    try:
+        return os.stat(filepath)
+    except OSError:
+        return None
+
+
+def run_backfill(jobs, processed, workers):
+    """Processes jobs with up to workers files at a time, printing progress and an ETA.
+
+    Returns a list of (filepath, error) for the files that failed.
+    """
+    total_audio = sum(duration for *_, duration in jobs)
+    done_audio = 0.0
+    failed = []
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backfill") as executor:
+        # Each file is marked processed in the state it had when its job was submitted
+        futures = {executor.submit(process_file, filepath, mode, actions): (filepath, duration, _stat(filepath))
+                   for filepath, mode, actions, duration in jobs}
+        for count, future in enumerate(as_completed(futures), start=1):
+            filepath, duration, st = futures[future]
+            try:
+                future.result()
+                status = "done"
+            except Exception as e:
+                failed.append((filepath, e))
+                status = "FAILED"
+            if status == "done" and st:
+                try:
+                    processed.mark(filepath, st=st)
+                except OSError as e:
+                    logging.warning(f"Could not mark {filepath} as processed: {e}")
+
+            # Files finish at a rate proportional to their audio length, so estimate by audio left
+            done_audio += duration
+            elapsed = time.monotonic() - started
+            remaining_audio = total_audio - done_audio
+            eta = elapsed / done_audio * remaining_audio if done_audio else 0
+            print(f"[{count}/{len(jobs)}] {status}: {os.path.basename(filepath)} | "
+                  f"elapsed {_format_seconds(elapsed)}, ETA {_format_seconds(eta)}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process every matching audio file in directories or glob patterns.")
+    parser.add_argument("paths", nargs="+", help="Directories (searched recursively), files or glob patterns")
+    parser.add_argument("--workers", type=int, default=2, help="How many files to process at the same time (default 2)")
+    parser.add_argument("--mode", help="Use this mode from config.json for every file instead of matching keywords")
+    parser.add_argument("--force", action="store_true", help="Process files again even if they were processed before")
+    parser.add_argument("--dry-run", action="store_true", help="Only list what would be processed")
+    args = parser.parse_args()
+
+    config = load_config()
+    if not config:
+        sys.exit(1)
+    if args.mode and args.mode not in config.get("modes", {}):
+        parser.error(f"Unknown mode '{args.mode}'. Modes in config.json: {', '.join(config.get('modes', {}))}")
+
+    processed = ProcessedStore(
+        PROCESSED_DB,
+        check_hash=config.get("general", {}).get("processed_check_hash", False),
+        legacy_log=PROCESSED_LOG,
+    )
+    files = find_audio_files(args.paths)
+    jobs, skipped = plan_backfill(files, config, processed, mode_override=args.mode, force=args.force)
+
+    total_audio = sum(duration for *_, duration in jobs)
+    print(f"Found {len(files)} audio file(s): {len(jobs)} to process ({_format_seconds(total_audio)} of audio), "
+          f"{len(skipped)} skipped.")
+    for filepath, mode, actions, duration in jobs:
+        print(f"  {mode:<14} {_format_seconds(duration):>8}  {filepath}")
+    if args.dry_run or not jobs:
+        return
+
+    # Completed steps are resumed from each file's journal, and unchanged
+    # prompts and inputs are answered from the result cache, so reruns are cheap
+    started = time.monotonic()
+    failed = run_backfill(jobs, processed, max(1, args.workers))
+
+    print("\n--- Backfill summary ---")
+    print(f"Processed: {len(jobs) - len(failed)}, failed: {len(failed)}, skipped: {len(skipped)}, "
+          f"time: {_format_seconds(time.monotonic() - started)}")
+    reasons = {}
+    for _, reason in skipped:
+        reasons[reason] = reasons.get(reason, 0) + 1
+    for reason, count in sorted(reasons.items()):
+        print(f"  skipped ({reason}): {count}")
+    for filepath, error in failed:
+        print(f"  FAILED {filepath}: {error}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
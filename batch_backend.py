@@ -0,0 +1,186 @@
+import time
+import itertools
+import threading
+from types import SimpleNamespace
+from concurrent.futures import Future
+
+# Batch states after which a job will not change any more
+TERMINAL_STATES = {
+    "JOB_STATE_SUCCEEDED",
+    "JOB_STATE_PARTIALLY_SUCCEEDED",
+    "JOB_STATE_FAILED",
+    "JOB_STATE_CANCELLED",
+    "JOB_STATE_EXPIRED",
+}
+
+
+def _state_name(batch_job):
+    state = getattr(batch_job, "state", None)
+    return getattr(state, "name", None) or str(state)
+
+
+def _part(item):
+    """Converts a prompt string or an uploaded File into a request part."""
+    if isinstance(item, str):
+        return {"text": item}
+    return {"file_data": {"file_uri": item.uri, "mime_type": item.mime_type}}
+
+
+class BatchCollector:
+    """Sends generate requests through the Gemini Batch API instead of one call each.
+
+    Callers block in generate() as usual. Requests arriving within flush_seconds of
+    each other (from concurrent chunks, actions and monitor jobs) are collected and
+    submitted as one batch job per model; a batch is sent early once max_requests
+    are waiting. Every submitted batch is polled every poll_seconds until it
+    finishes, and each caller then gets its own response text. Batches that do not
+    finish within timeout_seconds are cancelled and their callers fail.
+
+    batches is client.batches, or a StubBatches for offline runs.
+    """
+
+    def __init__(self, batches, extract_text, executor=None, flush_seconds=60, max_requests=50,
+                 poll_seconds=30, timeout_seconds=24 * 3600):
+        self.batches = batches
+        self.extract_text = extract_text
+        # Optional RequestExecutor that adds retries and rate limiting to every API call
+        self.executor = executor
+        self.flush_seconds = flush_seconds
+        self.max_requests = max_requests
+        self.poll_seconds = poll_seconds
+        self.timeout_seconds = timeout_seconds
+        self._lock = threading.Lock()
+        self._waiting = {}  # model -> [(request, Future)]
+        self._timers = {}   # model -> Timer that flushes it
+
+    def _call(self, fn, *args, **kwargs):
+        if self.executor:
+            return self.executor.call(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    def generate(self, model_name, contents):
+        """Queues one request and blocks until its batch has finished. Returns extract_text(response)."""
+        request = {"contents": [{"role": "user", "parts": [_part(item) for item in contents]}]}
+        future = Future()
+        with self._lock:
+            waiting = self._waiting.setdefault(model_name, [])
+            waiting.append((request, future))
+            if len(waiting) >= self.max_requests:
+                self._start_flush(model_name)
+            elif model_name not in self._timers:
+                timer = threading.Timer(self.flush_seconds, self._flush, args=(model_name,))
+                timer.daemon = True
+                self._timers[model_name] = timer
+                timer.start()
+        return future.result()
+
+    def _start_flush(self, model_name):
+        # Called with self._lock held
+        timer = self._timers.pop(model_name, None)
+        if timer:
+            timer.cancel()
+        items = self._waiting.pop(model_name, [])
+        if items:
+            threading.Thread(target=self._submit, args=(model_name, items), daemon=True).start()
+
+    def _flush(self, model_name):
+        with self._lock:
+            self._start_flush(model_name)
+
+    def _submit(self, model_name, items):
+        futures = [future for _, future in items]
+        try:
+            src = []
+            for i, (request, _) in enumerate(items):
+                src.append(dict(request, metadata={"key": str(i)}))
+            batch_job = self._call(
+                self.batches.create,
+                model=model_name,
+                src=src,
+                config={"display_name": f"transcription-{int(time.time())}"},
+            )
+            print(f"Submitted batch {batch_job.name} with {len(items)} request(s) for {model_name}.")
+            batch_job = self._wait(batch_job)
+            self._fan_out(batch_job, futures)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _wait(self, batch_job):
+        deadline = time.monotonic() + self.timeout_seconds
+        while _state_name(batch_job) not in TERMINAL_STATES:
+            if time.monotonic() > deadline:
+                try:
+                    self._call(self.batches.cancel, name=batch_job.name)
+                except Exception as e:
+                    print(f"Warning: Could not cancel batch {batch_job.name}: {e}")
+                raise TimeoutError(f"Batch {batch_job.name} did not finish within {self.timeout_seconds} seconds.")
+            time.sleep(self.poll_seconds)
+            batch_job = self._call(self.batches.get, name=batch_job.name)
+        print(f"Batch {batch_job.name} finished: {_state_name(batch_job)}")
+        return batch_job
+
+    def _fan_out(self, batch_job, futures):
+        state = _state_name(batch_job)
+        dest = getattr(batch_job, "dest", None)
+        responses = getattr(dest, "inlined_responses", None) or []
+        if state not in ("JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED") or not responses:
+            error = getattr(batch_job, "error", None)
+            raise RuntimeError(f"Batch {batch_job.name} ended in {state}" + (f": {error}" if error else ""))
+
+        for i, inlined in enumerate(responses):
+            # Responses come back in request order; the metadata key is used when present
+            metadata = getattr(inlined, "metadata", None) or {}
+            index = int(metadata.get("key", i))
+            if index >= len(futures):
+                continue
+            if getattr(inlined, "error", None):
+                futures[index].set_exception(RuntimeError(f"Batch request failed: {inlined.error}"))
+            else:
+                futures[index].set_result(self.extract_text(inlined.response))
+
+        for future in futures:
+            if not future.done():
+                future.set_exception(RuntimeError(f"Batch {batch_job.name} returned no response for a request."))
+
+
+class StubBatches:
+    """Offline stand-in for client.batches, for trying batch modes without network access.
+
+    Every batch finishes on the first poll and answers each request with a short
+    placeholder transcript naming the request, so outputs are written as usual.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create(self, model, src, config=None):
+        with self._lock:
+            name = f"batches/stub-{next(self._ids)}"
+        responses = []
+        for request in src:
+            parts = request["contents"][0]["parts"]
+            prompt = next((part["text"] for part in parts if "text" in part), "")
+            first_line = prompt.strip().splitlines()[0] if prompt.strip() else ""
+            text = f"[00:00] STUB: {model} response to: {first_line[:80]}\n[END]"
+            responses.append(SimpleNamespace(
+                response=SimpleNamespace(text=text),
+                metadata=request.get("metadata"),
+                error=None,
+            ))
+        self._jobs[name] = SimpleNamespace(
+            name=name,
+            state="JOB_STATE_SUCCEEDED",
+            dest=SimpleNamespace(inlined_responses=responses),
+            error=None,
+        )
+        return SimpleNamespace(name=name, state="JOB_STATE_PENDING")
+
+    def get(self, name):
+        return self._jobs[name]
+
+    def cancel(self, name):
+        self._jobs.pop(name, None)
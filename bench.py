@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import resource
+import subprocess
+
+from audio_tools import FFMPEG, _run
+
+# A 20 second pattern of tone with a 2 second pause, so silence detection has cut points
+PATTERN = "0.3*sin(2*PI*220*t)*lt(mod(t\\,20)\\,18)"
+DEFAULT_ACTIONS = ["transcribe_podcast", "summary", "linkedin", "description"]
+
+
+def make_synthetic_audio(path, minutes):
+    """Writes a mono 64k MP3 of the given length, looping a short generated pattern."""
+    pattern_path = f"{path}.pattern.wav"
+    _run([FFMPEG, "-v", "error", "-y", "-f", "lavfi", "-i", f"aevalsrc={PATTERN}:s=16000:d=20", pattern_path])
+    _run([
+        FFMPEG, "-v", "error", "-y", "-stream_loop", "-1", "-i", pattern_path,
+        "-t", str(minutes * 60), "-c:a", "libmp3lame", "-b:a", "64k", path,
+    ])
+    os.remove(pattern_path)
+    return path
+
+
+def _peak_rss_mb(who):
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_one(audio_path, actions):
+    """Runs one job in this process and returns the measurements. Called in a fresh process per size."""
+    os.environ["GEMINI_CLIENT"] = "fake"
+    import main
+    from metrics import Metrics
+    from upload_manager import UploadManager
+
+    work_dir = tempfile.mkdtemp(prefix="bench_")
+    try:
+        # Keep the benchmark away from the real cache, upload registry and metrics files;
+        # the pipeline's own spans give the time per stage
+        main.get_result_cache().enabled = False
+        main.UPLOADS = UploadManager(main.get_client(), os.path.join(work_dir, "uploads.json"), executor=main.get_api())
+        main.METRICS = Metrics(json_log=os.path.join(work_dir, "metrics.jsonl"), prometheus_file=None)
+
+        job_path = os.path.join(work_dir, os.path.basename(audio_path))
+        os.symlink(os.path.abspath(audio_path), job_path)
+
+        started = time.perf_counter()
+        main.run_job(job_path, "Podcast", ["Host", "Guest"], actions, backend="interactive")
+        wall = time.perf_counter() - started
+
+        return {
+            "wall_seconds": wall,
+            "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+            "peak_child_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+            "stages": {stage: {"calls": calls, "seconds": total}
+                       for stage, (calls, total) in main.METRICS.stage_totals().items()},
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def print_report(results):
+    for minutes, result in results:
+        print(f"\n=== {minutes} minutes of audio ===")
+        print(f"Wall time: {result['wall_seconds']:.1f}s | peak RSS: {result['peak_rss_mb']:.0f} MB "
+              f"(largest ffmpeg: {result['peak_child_rss_mb']:.0f} MB)")
+        print("Stage time is summed over threads, so concurrent stages can exceed the wall time.")
+        for stage, data in sorted(result["stages"].items(), key=lambda item: -item[1]["seconds"]):
+            print(f"  {stage:<20} {data['calls']:>4} call(s) {data['seconds']:>9.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the pipeline offline: runs each recording length through main.run_job "
+                    "against the FakeClient (no API quota) and reports wall time, peak RSS and time per stage."
+    )
+    parser.add_argument("--minutes", nargs="+", type=float, default=[10, 60, 180], help="Recording lengths to test")
+    parser.add_argument("--actions", nargs="+", default=DEFAULT_ACTIONS, help="Actions to run for every recording")
+    parser.add_argument("--audio-dir", help="Keep the synthetic recordings here and reuse them on later runs")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        # Child process: the last line of output is the result
+        print(json.dumps(run_one(args.run_one, args.actions)))
+        return
+
+    audio_dir = args.audio_dir or tempfile.mkdtemp(prefix="bench_audio_")
+    os.makedirs(audio_dir, exist_ok=True)
+    results = []
+    try:
+        for minutes in args.minutes:
+            audio_path = os.path.join(audio_dir, f"synthetic_{minutes:g}min.mp3")
+            if not os.path.exists(audio_path):
+                print(f"Generating {minutes:g} minutes of synthetic audio...")
+                make_synthetic_audio(audio_path, minutes)
+
+            print(f"Running pipeline on {audio_path}...")
+            # A fresh process per size, so peak RSS belongs to that run alone
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run-one", audio_path, "--actions", *args.actions],
+                capture_output=True, text=True,
+            )
+            if completed.returncode != 0:
+                print(completed.stdout[-2000:], completed.stderr[-2000:])
+                sys.exit(f"Benchmark run for {minutes:g} minutes failed.")
+            results.append((minutes, json.loads(completed.stdout.strip().splitlines()[-1])))
+    finally:
+        if not args.audio_dir:
+            shutil.rmtree(audio_dir, ignore_errors=True)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([{"minutes": minutes, **result} for minutes, result in results], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+import re
+import json
+
+# A caption starts with [MM:SS] or [HH:MM:SS] near the beginning of a line. A little
+# markup may come before and after it: direction marks, bullets, bold (e.g. "- **[00:00]** ")
+CAPTION_RE = re.compile(r"^[^\w\[\]]{0,8}?\[(\d{1,2}:\d{2}(?::\d{2})?)\]\**\s*(.*)$")
+# Any timestamp, anywhere in the text
+TIMESTAMP_RE = re.compile(r"\[(\d{1,2}:\d{2}(?::\d{2})?)\]")
+# "Name: text" at the start of a caption; names are short, so a colon later in a sentence is not one
+SPEAKER_RE = re.compile(r"^([^\s:\[\]][^:\[\]]{0,39}?):\s+(.*)$")
+END_TAG = "[END]"
+
+# How far a model timestamp may be off from the real cut point, in seconds
+TIMESTAMP_TOLERANCE = 1.0
+
+# How many captions at the end of the previous chunk are compared for duplicates
+DEDUP_WINDOW = 5
+
+# Subtitle cues end where the next caption starts, but never run longer than this
+MAX_CUE_SECONDS = 10
+
+
+def parse_timestamp(timestamp_str):
+    """Converts MM:SS or HH:MM:SS to seconds."""
+    seconds = 0
+    for part in timestamp_str.split(":"):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def format_timestamp(seconds):
+    """Converts seconds to MM:SS, or HH:MM:SS from one hour on (the transcript format)."""
+    seconds = int(seconds)
+    hours, minutes, secs = seconds // 3600, seconds % 3600 // 60, seconds % 60
+    if hours > 0:
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+
+def shift_timestamps(text, offset_seconds):
+    """Moves every [MM:SS] / [HH:MM:SS] in the text by offset_seconds, wherever it appears."""
+    if not offset_seconds:
+        return text
+    return TIMESTAMP_RE.sub(lambda m: f"[{format_timestamp(parse_timestamp(m.group(1)) + offset_seconds)}]", text)
+
+
+def _bare(line):
+    """A line without surrounding whitespace, direction marks and markdown markup."""
+    return line.strip().strip("\u200e\u200f*-_ ")
+
+
+def _split_timestamps(text):
+    """Splits text at its timestamps into (pieces, stamps), len(pieces) == len(stamps) + 1.
+
+    The stamps are in seconds, so shifting them is arithmetic; _join_timestamps
+    puts the text back together.
+    """
+    if "[" not in text:
+        return (text,), ()
+    pieces, stamps, pos = [], [], 0
+    for match in TIMESTAMP_RE.finditer(text):
+        pieces.append(text[pos:match.start()])
+        stamps.append(parse_timestamp(match.group(1)))
+        pos = match.end()
+    pieces.append(text[pos:])
+    return tuple(pieces), tuple(stamps)
+
+
+def _append_split(pieces, stamps, text):
+    """Appends text to a split that is being built up (lists in the form _split_timestamps returns)."""
+    if "[" not in text:
+        pieces[-1] += text
+        return
+    more_pieces, more_stamps = _split_timestamps(text)
+    pieces[-1] += more_pieces[0]
+    pieces.extend(more_pieces[1:])
+    stamps.extend(more_stamps)
+
+
+def _join_timestamps(split, offset_seconds):
+    pieces, stamps = split
+    if not stamps:
+        return pieces[0]
+    parts = [pieces[0]]
+    for stamp, piece in zip(stamps, pieces[1:]):
+        parts.append(f"[{format_timestamp(stamp + offset_seconds)}]")
+        parts.append(piece)
+    return "".join(parts)
+
+
+def _cue_text(text):
+    return "\n".join(line.strip() for line in text.strip().splitlines())
+
+
+def _subtitle_timestamp(seconds, separator):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}{separator}000"
+
+
+class Caption:
+    """One caption: start in seconds (None for text before the first timestamp), speaker (or None) and text.
+
+    Text may span several lines; lines without a timestamp belong to the caption above them.
+    raw is the caption's lines as the model wrote them, which to_text reproduces. Both are
+    kept split at their timestamps, so shifting a caption only adds to offset.
+    """
+
+    __slots__ = ("start", "speaker", "offset", "_text", "_raw")
+
+    def __init__(self, start, speaker, text, raw=None):
+        self.start = start
+        self.speaker = speaker
+        self.offset = 0
+        self._text = _split_timestamps(text)
+        self._raw = None if raw is None else _split_timestamps(raw)
+
+    @classmethod
+    def _from_split(cls, start, speaker, text, raw):
+        caption = cls.__new__(cls)
+        caption.start = start
+        caption.speaker = speaker
+        caption.offset = 0
+        caption._text = text
+        caption._raw = raw
+        return caption
+
+    @property
+    def text(self):
+        return _join_timestamps(self._text, self.offset)
+
+    def shifted(self, offset_seconds):
+        """Returns a copy with its start and every timestamp in its text moved by offset_seconds."""
+        copy = Caption._from_split(
+            None if self.start is None else self.start + offset_seconds, self.speaker, self._text, self._raw
+        )
+        copy.offset = self.offset + offset_seconds
+        return copy
+
+    def body(self):
+        return f"{self.speaker}: {self.text}" if self.speaker else self.text
+
+    def to_text(self):
+        if self._raw is not None:
+            return _join_timestamps(self._raw, self.offset)
+        if self.start is None:
+            return self.body()
+        return f"[{format_timestamp(self.start)}] {self.body()}"
+
+    def normalized(self):
+        """Caption text without its timestamp, for comparing captions across chunks."""
+        return " ".join(self.body().split()).lower()
+
+
+class Transcript:
+    """A parsed transcript: a list of Captions and whether it ended with [END].
+
+    Parsing happens once; shifting, merging and every output format work on the
+    caption list directly.
+    """
+
+    __slots__ = ("captions", "ended")
+
+    def __init__(self, captions=None, ended=False):
+        self.captions = captions if captions is not None else []
+        self.ended = ended
+
+    @classmethod
+    def parse(cls, text):
+        # [start, speaker, text lines, raw pieces, raw stamps] per caption; see _split_timestamps
+        entries = []
+        ended = False
+        for line in text.splitlines():
+            stripped = line.strip()
+            match = CAPTION_RE.match(stripped)
+            if match:
+                body = match.group(2).strip()
+                if _bare(body) == END_TAG:
+                    ended = True
+                    continue
+                start = parse_timestamp(match.group(1))
+                speaker_match = SPEAKER_RE.match(body)
+                if speaker_match:
+                    speaker, body = speaker_match.group(1), speaker_match.group(2)
+                else:
+                    speaker = None
+                # The leading timestamp was found by CAPTION_RE; only the rest of the line is searched
+                indent = len(line) - len(line.lstrip())
+                pieces, stamps = [line[:indent + match.start(1) - 1], ""], [start]
+                _append_split(pieces, stamps, line[indent + match.end(1) + 1:])
+                entries.append((start, speaker, [body], pieces, stamps))
+            elif _bare(stripped) == END_TAG:
+                ended = True
+            elif entries:
+                entries[-1][2].append(line)
+                _append_split(entries[-1][3], entries[-1][4], "\n" + line)
+            elif stripped:
+                pieces, stamps = [""], []
+                _append_split(pieces, stamps, line)
+                entries.append((None, None, [line], pieces, stamps))
+        captions = [
+            Caption._from_split(start, speaker, _split_timestamps("\n".join(lines)), (tuple(pieces), tuple(stamps)))
+            for start, speaker, lines, pieces, stamps in entries
+        ]
+        return cls(captions, ended)
+
+    def shifted(self, offset_seconds):
+        """Returns a copy with every timestamp moved by offset_seconds, including ones inside the text."""
+        if not offset_seconds:
+            return Transcript(list(self.captions), self.ended)
+        return Transcript([caption.shifted(offset_seconds) for caption in self.captions], self.ended)
+
+    def to_text(self):
+        lines = [caption.to_text() for caption in self.captions]
+        if self.ended:
+            lines.append(END_TAG)
+        return "\n".join(lines)
+
+    def _cues(self):
+        """Yields (start, end, caption) for every timed caption."""
+        timed = [c for c in self.captions if c.start is not None]
+        for i, caption in enumerate(timed):
+            end = caption.start + MAX_CUE_SECONDS
+            if i + 1 < len(timed) and timed[i + 1].start > caption.start:
+                end = min(end, timed[i + 1].start)
+            yield caption.start, end, caption
+
+    def to_srt(self):
+        blocks = []
+        for i, (start, end, caption) in enumerate(self._cues(), start=1):
+            timing = f"{_subtitle_timestamp(start, ',')} --> {_subtitle_timestamp(end, ',')}"
+            blocks.append(f"{i}\n{timing}\n{_cue_text(caption.body())}\n")
+        return "\n".join(blocks)
+
+    def to_vtt(self):
+        blocks = ["WEBVTT\n"]
+        for start, end, caption in self._cues():
+            timing = f"{_subtitle_timestamp(start, '.')} --> {_subtitle_timestamp(end, '.')}"
+            text = _cue_text(caption.text)
+            if caption.speaker:
+                text = f"<v {caption.speaker}>{text}"
+            blocks.append(f"{timing}\n{text}\n")
+        return "\n".join(blocks)
+
+    def to_json(self):
+        data = {
+            "captions": [{"start": c.start, "speaker": c.speaker, "text": c.text} for c in self.captions],
+            "ended": self.ended,
+        }
+        return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+# Output formats for export_transcript: file extension -> serializer
+EXPORT_FORMATS = {
+    "srt": Transcript.to_srt,
+    "vtt": Transcript.to_vtt,
+    "json": Transcript.to_json,
+}
+
+
+def export_transcript(transcript, base_path, formats):
+    """Writes the transcript as base_path + ".<format>" for each requested format. Returns the paths."""
+    paths = []
+    for fmt in formats:
+        if fmt not in EXPORT_FORMATS:
+            print(f"Warning: Unknown caption format '{fmt}', skipping.")
+            continue
+        path = f"{base_path}.{fmt}"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(EXPORT_FORMATS[fmt](transcript))
+        paths.append(path)
+    return paths
+
+
+def merge_transcripts(parts, keep_from):
+    """Merges chunk Transcripts (timestamps already shifted to the full recording) in one pass.
+
+    keep_from[i] is the cut point where chunk i takes over from chunk i-1; chunk i
+    started a little earlier (the overlap). Captions of chunk i in that overlap are
+    dropped, as are captions close to the cut that repeat one of the previous
+    chunk's last captions. The merged transcript is ended if the last chunk was.
+    """
+    merged = []
+    for i, part in enumerate(parts):
+        if i == 0:
+            merged.extend(part.captions)
+            continue
+        cut = keep_from[i]
+        recent = {caption.normalized() for caption in merged[-DEDUP_WINDOW:]}
+        for caption in part.captions:
+            if caption.start is not None and caption.start < cut + TIMESTAMP_TOLERANCE:
+                if caption.start < cut - TIMESTAMP_TOLERANCE or caption.normalized() in recent:
+                    continue
+            merged.append(caption)
+    return Transcript(merged, bool(parts) and parts[-1].ended)
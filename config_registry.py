@@ -0,0 +1,119 @@
+import os
+import json
+import logging
+import threading
+from functools import lru_cache
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+
+# Signature of a registry that has not looked at its file yet
+_UNREAD = object()
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def validate_config(config):
+    """Returns a list of problems with the structure of a parsed config.json (empty if it is fine)."""
+    if not isinstance(config, dict):
+        return ["the top level must be an object"]
+    problems = []
+    for section in ("general", "modes", "prompts"):
+        if not isinstance(config.get(section, {}), dict):
+            problems.append(f"'{section}' must be an object")
+    watch_paths = config.get("watch_paths", [])
+    if not isinstance(watch_paths, list) or not all(isinstance(e, dict) and isinstance(e.get("path"), str) for e in watch_paths):
+        problems.append("'watch_paths' must be a list of objects with a 'path'")
+    modes = config.get("modes", {})
+    for name, mode in (modes.items() if isinstance(modes, dict) else []):
+        if not isinstance(mode, dict):
+            problems.append(f"mode '{name}' must be an object")
+            continue
+        for key in ("keywords", "actions"):
+            items = mode.get(key, [])
+            if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+                problems.append(f"mode '{name}': '{key}' must be a list of strings")
+    prompts = config.get("prompts", {})
+    for key, prompt in (prompts.items() if isinstance(prompts, dict) else []):
+        if not isinstance(prompt, str):
+            problems.append(f"prompt '{key}' must be a string")
+    return problems
+
+
+@lru_cache(maxsize=64)
+def compile_template(source):
+    """Compiles a Jinja2 prompt template once per distinct source text."""
+    from jinja2 import Template
+    return Template(source)
+
+
+@lru_cache(maxsize=1024)
+def _render(source, values):
+    return compile_template(source).render(**dict(values))
+
+
+def render_template(source, **values):
+    """Renders a prompt template. Renders are cached per (template, values), e.g. per speaker list."""
+    # Lists (speakers) become tuples so the values can be part of the cache key
+    frozen = tuple(sorted((name, tuple(v) if isinstance(v, list) else v) for name, v in values.items()))
+    return _render(source, frozen)
+
+
+class ConfigRegistry:
+    """A shared view of config.json that is re-read only when the file changes.
+
+    Every get() compares the file's mtime and size with the last load. A changed
+    file is parsed and validated once; if that fails, the previous config stays
+    in use and the error is logged once per change. The returned dict is shared,
+    so callers must not modify it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._config = None
+        self._signature = _UNREAD
+
+    def get(self):
+        """Returns the current config, or None if the file has never loaded successfully."""
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+        with self._lock:
+            if signature != self._signature:
+                self._signature = signature
+                self._reload(signature)
+            return self._config
+
+    def _reload(self, signature):
+        # Called with self._lock held
+        if signature is None:
+            logging.error(f"Configuration file {self.path} not found.")
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.error(f"Error parsing {self.path}: {e}")
+            return
+        problems = validate_config(config)
+        if problems:
+            logging.error(f"Invalid configuration in {self.path}: {'; '.join(problems)}")
+            return
+        if self._config is not None:
+            logging.info(f"Reloaded {self.path}")
+        self._config = config
+
+    def prompt(self, key, default_prompt):
+        return (self.get() or {}).get("prompts", {}).get(key, default_prompt)
+
+
+def get_registry(path=CONFIG_PATH):
+    """Returns the ConfigRegistry shared by everything in the process that reads this config file."""
+    path = os.path.abspath(path)
+    with _registries_lock:
+        if path not in _registries:
+            _registries[path] = ConfigRegistry(path)
+        return _registries[path]
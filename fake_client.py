@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import random
+import hashlib
+import mimetypes
+import threading
+from types import SimpleNamespace
+
+from audio_tools import probe_duration
+from captions import format_timestamp
+from batch_backend import StubBatches
+
+
+class FakeAPIError(Exception):
+    """Raised by FakeClient for simulated failures. Carries an HTTP code like the real client's errors."""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+def request_key(model, contents):
+    """Identifies a generate request for recording and replay.
+
+    Text is keyed by its content. Uploaded files are keyed by size and MIME type,
+    because their remote names differ on every upload.
+    """
+    digest = hashlib.sha256(model.encode("utf-8"))
+    for item in contents:
+        if isinstance(item, str):
+            digest.update(b"text:" + item.encode("utf-8"))
+        else:
+            digest.update(f"file:{getattr(item, 'size_bytes', None)}:{getattr(item, 'mime_type', None)}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_recordings(path):
+    recordings = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                recordings[entry["key"]] = entry["text"]
+    return recordings
+
+
+class _FakeFiles:
+    def __init__(self, owner):
+        self._owner = owner
+        self._files = {}
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def upload(self, file):
+        owner = self._owner
+        size = os.path.getsize(file)
+        time.sleep(owner.upload_latency + size / (owner.upload_mbps * 1024 * 1024))
+        owner.maybe_fail("upload")
+        try:
+            duration = probe_duration(file)
+        except Exception:
+            duration = None  # Not audio, e.g. an uploaded transcript
+        with self._lock:
+            self._ids += 1
+            name = f"files/fake-{self._ids}"
+            remote_file = SimpleNamespace(
+                name=name,
+                uri=f"https://fake.local/{name}",
+                # Guessed from the extension, like the SDK does
+                mime_type=mimetypes.guess_type(file)[0],
+                size_bytes=size,
+                duration_seconds=duration,
+                expiration_time=None,
+                state=SimpleNamespace(name="ACTIVE"),
+            )
+            self._files[name] = remote_file
+        return remote_file
+
+    def get(self, name):
+        with self._lock:
+            if name not in self._files:
+                raise FakeAPIError(404, f"File {name} not found.")
+            return self._files[name]
+
+    def delete(self, name):
+        with self._lock:
+            self._files.pop(name, None)
+
+
+def _usage(contents, text):
+    """Rough token counts in the shape of usage_metadata: 32 tokens per second of audio, 4 characters per text token."""
+    prompt_tokens = sum(
+        int((getattr(item, "duration_seconds", None) or 0) * 32) if not isinstance(item, str) else len(item) // 4
+        for item in contents
+    )
+    return SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=len(text) // 4)
+
+
+class _FakeModels:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def generate_content(self, model, contents):
+        text = self._owner.respond(model, contents)
+        return SimpleNamespace(text=text, usage_metadata=_usage(contents, text))
+
+    def generate_content_stream(self, model, contents):
+        text = self._owner.respond(model, contents, sleep=False)
+        pieces = text.splitlines(keepends=True) or [text]
+        delay = self._owner.generation_time(contents) / len(pieces)
+        for i, piece in enumerate(pieces):
+            time.sleep(delay)
+            # Like the real stream, the totals arrive with the last chunk
+            usage = _usage(contents, text) if i == len(pieces) - 1 else None
+            yield SimpleNamespace(text=piece, usage_metadata=usage)
+
+
+class FakeClient:
+    """Local stand-in for genai.Client, for measuring the pipeline without API quota.
+
+    Uploads take upload_latency plus size / upload_mbps seconds. A generate call
+    takes generate_latency, plus seconds_per_audio_minute for every minute of
+    uploaded audio in the request. A share of calls fails with a 500
+    (error_rate) or a 429 (rate_limit_rate), so the retry path is exercised too.
+
+    Responses come from recordings made with RecordingClient when the request
+    matches one (replay), and are synthesized otherwise: one caption every 30
+    seconds of audio for transcriptions, and a short paragraph for text requests.
+    """
+
+    def __init__(self, upload_mbps=20.0, upload_latency=0.2, generate_latency=1.0, seconds_per_audio_minute=0.1,
+                 error_rate=0.0, rate_limit_rate=0.0, replay=None, seed=None):
+        self.upload_mbps = upload_mbps
+        self.upload_latency = upload_latency
+        self.generate_latency = generate_latency
+        self.seconds_per_audio_minute = seconds_per_audio_minute
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.recordings = load_recordings(replay) if replay else {}
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.files = _FakeFiles(self)
+        self.models = _FakeModels(self)
+        self.batches = StubBatches()
+
+    @classmethod
+    def from_env(cls):
+        """Builds a FakeClient from FAKE_* environment variables (see README)."""
+        env = os.environ.get
+        return cls(
+            upload_mbps=float(env("FAKE_UPLOAD_MBPS", 20)),
+            upload_latency=float(env("FAKE_UPLOAD_LATENCY", 0.2)),
+            generate_latency=float(env("FAKE_GENERATE_LATENCY", 1.0)),
+            seconds_per_audio_minute=float(env("FAKE_SECONDS_PER_AUDIO_MINUTE", 0.1)),
+            error_rate=float(env("FAKE_ERROR_RATE", 0)),
+            rate_limit_rate=float(env("FAKE_RATE_LIMIT_RATE", 0)),
+            replay=env("FAKE_REPLAY") or None,
+            seed=int(env("FAKE_SEED")) if env("FAKE_SEED") else None,
+        )
+
+    def maybe_fail(self, what):
+        with self._random_lock:
+            roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            raise FakeAPIError(429, f"Simulated rate limit during {what}.")
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise FakeAPIError(500, f"Simulated server error during {what}.")
+
+    def generation_time(self, contents):
+        audio_seconds = sum(getattr(item, "duration_seconds", None) or 0 for item in contents)
+        return self.generate_latency + audio_seconds / 60 * self.seconds_per_audio_minute
+
+    def respond(self, model, contents, sleep=True):
+        if sleep:
+            time.sleep(self.generation_time(contents))
+        self.maybe_fail("generate")
+
+        recorded = self.recordings.get(request_key(model, contents))
+        if recorded is not None:
+            return recorded
+
+        audio_seconds = sum(getattr(item, "duration_seconds", None) or 0 for item in contents)
+        if audio_seconds:
+            lines = [f"[{format_timestamp(t)}] Speaker {i % 2 + 1}: Synthetic caption {i}."
+                     for i, t in enumerate(range(0, int(audio_seconds), 30))]
+            return "\n".join(lines + ["[END]"])
+        return "Synthetic response.\nThis text was generated by FakeClient."
+
+
+class _RecordingModels:
+    def __init__(self, models, recorder):
+        self._models = models
+        self._recorder = recorder
+
+    def generate_content(self, model, contents, **kwargs):
+        response = self._models.generate_content(model=model, contents=contents, **kwargs)
+        self._recorder.record(model, contents, getattr(response, "text", None))
+        return response
+
+    def generate_content_stream(self, model, contents, **kwargs):
+        parts = []
+        for chunk in self._models.generate_content_stream(model=model, contents=contents, **kwargs):
+            parts.append(getattr(chunk, "text", None) or "")
+            yield chunk
+        self._recorder.record(model, contents, "".join(parts))
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+
+class RecordingClient:
+    """Wraps a real client and appends every generate response to a JSONL file for FakeClient replay."""
+
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self._lock = threading.Lock()
+        self.models = _RecordingModels(client.models, self)
+
+    def record(self, model, contents, text):
+        if not text:
+            return
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": request_key(model, contents), "text": text}, ensure_ascii=False) + "\n")
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
@@ -0,0 +1,79 @@
+import os
+import json
+import threading
+
+
+class JobJournal:
+    """Checkpoints the progress of one job so a restart resumes where it stopped.
+
+    The journal is a small JSON file kept next to the job's outputs. It records the
+    text of every finished transcription chunk and every completed step (the full
+    transcription and each generation action). Every update is written atomically
+    (temp file + rename), so a crash never leaves a half-written journal.
+
+    A journal only applies to the exact source file and model it was created for;
+    if the audio is re-exported (size or mtime change) it starts over.
+    """
+
+    def __init__(self, path, source_path, model_name):
+        self.path = path
+        self._lock = threading.Lock()
+        stat = os.stat(source_path)
+        self._fingerprint = {
+            "source": os.path.abspath(source_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "model": model_name,
+        }
+        self._data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = None
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Ignoring unreadable job journal {self.path}: {e}")
+            data = None
+
+        if not data or data.get("fingerprint") != self._fingerprint:
+            return {"fingerprint": self._fingerprint, "chunks": {}, "steps": {}}
+        print(f"Resuming from job journal {self.path}")
+        return data
+
+    def _save(self):
+        # Called with self._lock held
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def get_chunk(self, key):
+        """Returns the saved transcript of a chunk, or None if it has not finished yet."""
+        with self._lock:
+            return self._data["chunks"].get(key)
+
+    def save_chunk(self, key, text):
+        with self._lock:
+            self._data["chunks"][key] = text
+            self._save()
+
+    def is_done(self, step, output_path=None):
+        """True if step completed earlier and (when given) its output file still exists."""
+        with self._lock:
+            done = step in self._data["steps"]
+        return done and (output_path is None or os.path.exists(output_path))
+
+    def mark_done(self, step, output_path=None):
+        with self._lock:
+            self._data["steps"][step] = output_path
+            self._save()
+
+    def complete(self):
+        """Removes the journal once the whole job has succeeded."""
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import sqlite3
+import argparse
+from contextlib import contextmanager
+
+# Queue database used by the monitor and the command line below
+DEFAULT_PATH = "jobs.db"
+
+STATES = ("pending", "running", "done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL UNIQUE,
+    mode TEXT NOT NULL,
+    actions TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    duration REAL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class JobQueue:
+    """Persistent queue of monitor jobs, stored in a small SQLite database.
+
+    Every detected file becomes one job that moves through pending -> running ->
+    done or failed. Pending jobs are handed out by mode priority (higher first),
+    then shortest audio first, then in arrival order, so a short urgent recording
+    does not wait behind a long workshop.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with self._connect() as db:
+            db.execute(_SCHEMA)
+
+    def recover(self):
+        """Puts jobs left running by a crash or restart back to pending. Call once at monitor startup."""
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET state = 'pending', updated_at = ? WHERE state = 'running'", (time.time(),))
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation; the CLI may use the database at the same time
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get(self, path):
+        with self._connect() as db:
+            return db.execute("SELECT * FROM jobs WHERE path = ?", (path,)).fetchone()
+
+    def enqueue(self, path, mode, actions, priority=0, duration=None):
+        """Adds a pending job for path. Returns False if the file is already pending or running.
+
+        A failed or done job is put back to pending: the caller only enqueues files
+        that still need processing, e.g. a failed file seen again or a re-exported one.
+        """
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT state FROM jobs WHERE path = ?", (path,)).fetchone()
+            if row is None:
+                db.execute(
+                    "INSERT INTO jobs (path, mode, actions, priority, duration, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (path, mode, json.dumps(actions), priority, duration, now, now),
+                )
+                return True
+            if row["state"] in ("pending", "running"):
+                return False
+            db.execute(
+                "UPDATE jobs SET mode = ?, actions = ?, priority = ?, duration = ?, state = 'pending', updated_at = ?"
+                " WHERE path = ?",
+                (mode, json.dumps(actions), priority, duration, now, path),
+            )
+            return True
+
+    def pending(self):
+        """Returns the pending jobs in the order they should run."""
+        with self._connect() as db:
+            return db.execute(
+                "SELECT * FROM jobs WHERE state = 'pending'"
+                " ORDER BY priority DESC, duration IS NULL, duration, created_at"
+            ).fetchall()
+
+    def start(self, job_id):
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, error = NULL, updated_at = ? WHERE id = ?",
+                (time.time(), job_id),
+            )
+
+    def finish(self, job_id, success, error=None):
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET state = ?, error = ?, updated_at = ? WHERE id = ?",
+                ("done" if success else "failed", error, time.time(), job_id),
+            )
+
+    def requeue(self, job_id):
+        """Puts a finished or failed job back to pending. Returns False if there is no such job or it is running."""
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET state = 'pending', error = NULL, updated_at = ? WHERE id = ? AND state != 'running'",
+                (time.time(), job_id),
+            )
+            return cursor.rowcount > 0
+
+    def list(self, state=None):
+        with self._connect() as db:
+            if state:
+                return db.execute("SELECT * FROM jobs WHERE state = ? ORDER BY updated_at DESC", (state,)).fetchall()
+            return db.execute("SELECT * FROM jobs ORDER BY updated_at DESC").fetchall()
+
+
+def _format_duration(seconds):
+    if seconds is None:
+        return "?"
+    return f"{int(seconds // 60)}m{int(seconds % 60):02d}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and requeue monitor jobs.")
+    parser.add_argument("--db", default=DEFAULT_PATH, help=f"Queue database (default {DEFAULT_PATH})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="List jobs, most recently updated first")
+    list_parser.add_argument("--state", choices=STATES, help="Only list jobs in this state")
+
+    requeue_parser = subparsers.add_parser("requeue", help="Put jobs back to pending")
+    requeue_parser.add_argument("ids", nargs="*", type=int, help="Job ids (see list)")
+    requeue_parser.add_argument("--failed", action="store_true", help="Requeue every failed job")
+
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        parser.error(f"{args.db} not found. It is created by the monitor.")
+    jobs = JobQueue(args.db)
+
+    if args.command == "list":
+        for job in jobs.list(args.state):
+            updated = time.strftime("%Y-%m-%d %H:%M", time.localtime(job["updated_at"]))
+            line = (f"{job['id']:>5}  {job['state']:<8} {job['mode']:<14} p{job['priority']:<3} "
+                    f"{_format_duration(job['duration']):>9}  {updated}  {os.path.basename(job['path'])}")
+            if job["error"]:
+                line += f"  ({job['error']})"
+            print(line)
+        return
+
+    ids = list(args.ids)
+    if args.failed:
+        ids += [job["id"] for job in jobs.list("failed")]
+    if not ids:
+        parser.error("Give job ids or --failed.")
+    for job_id in ids:
+        if jobs.requeue(job_id):
+            print(f"Requeued job {job_id}.")
+        else:
+            print(f"Job {job_id} does not exist or is running.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,80 @@
 import os
 import time
-from jinja2 import Template
-from google import genai
-from pydub import AudioSegment
-import math
-import re
+import contextvars
+import threading
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 
 
 import argparse
 import sys
-import json
-from dotenv import load_dotenv
-
-load_dotenv()
+from result_cache import cache_from_config, hash_file
+from config_registry import get_registry, render_template
+from audio_tools import probe_duration, extract_segment, codec_extension, find_speech_bounds, choose_chunking, plan_chunks
+from captions import Transcript, merge_transcripts, export_transcript, shift_timestamps
+from upload_manager import UploadManager
+from job_journal import JobJournal
+from api_executor import executor_from_config
+from batch_backend import BatchCollector, StubBatches
+import metrics
+from metrics import metrics_from_config
+
+# Importing this module has no side effects: the heavy dependencies (google-genai,
+# jinja2, python-dotenv), config.json and the API client are loaded on first use,
+# through the get_* functions below. A run that is answered from the journal or the
+# result cache never creates a client at all.
 
 # --- General Variables ---
-# Best practice: store your API key in an environment variable
-api_key = os.environ.get("GOOGLE_API_KEY")
-if not api_key:
-    print("Error: GOOGLE_API_KEY environment variable not set.")
-    print("Please set it by running 'export GOOGLE_API_KEY=\"YOUR_API_KEY\"' in your terminal.")
-    sys.exit(1)
-
-client = genai.Client(api_key=api_key)
+def create_client():
+    """Builds the Gemini client.
+
+    GEMINI_CLIENT=fake selects the offline FakeClient (fake_client.py), which needs
+    no API key. GEMINI_RECORD=<file> records every response of the real client
+    for later replay by the FakeClient. Raises RuntimeError if no API key is set.
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    if os.environ.get("GEMINI_CLIENT", "").lower() == "fake":
+        from fake_client import FakeClient
+        return FakeClient.from_env()
+
+    # Best practice: store your API key in an environment variable
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        raise RuntimeError(
+            "GOOGLE_API_KEY environment variable not set. "
+            "Please set it by running 'export GOOGLE_API_KEY=\"YOUR_API_KEY\"' in your terminal."
+        )
+
+    from google import genai
+    real_client = genai.Client(api_key=api_key)
+    if os.environ.get("GEMINI_RECORD"):
+        from fake_client import RecordingClient
+        return RecordingClient(real_client, os.environ["GEMINI_RECORD"])
+    return real_client
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Shared state, built on first use by the get_* functions. Assigning one of these
+# before first use (e.g. UPLOADS in bench.py) replaces the default. Their settings
+# are read from config.json once; other settings and prompts follow every change.
+client = None
+RESULT_CACHE = None
+METRICS = None
+API = None
+UPLOADS = None
+_init_lock = threading.RLock()
+
+def _lazy(name, factory):
+    """Returns the module global name, building it with factory() the first time."""
+    value = globals()[name]
+    if value is None:
+        with _init_lock:
+            value = globals()[name]
+            if value is None:
+                value = globals()[name] = factory()
+    return value
 
 # --- Helper Functions ---
 
@@ -43,28 +95,217 @@ def _extract_text_from_response(response):
     except Exception:
         return ""
 
-
-
-# Validates that JSON is valid
-def load_config():
-    try:
-        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
-        with open(config_path, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Warning: Could not load config.json: {e}")
-        return {}
-
-CONFIG = load_config()
+def get_config():
+    """Returns config.json, re-read whenever the file changes (shared with the monitor, see config_registry)."""
+    return get_registry().get() or {}
 
 def get_prompt(key, default_prompt):
-    return CONFIG.get("prompts", {}).get(key, default_prompt)
+    return get_registry().prompt(key, default_prompt)
+
+def render_prompt(prompt_str, **values):
+    """Renders a Jinja2 prompt template (jinja2 is only imported by the actions that need it)."""
+    return render_template(prompt_str, **values)
+
+def get_result_cache():
+    return _lazy("RESULT_CACHE", lambda: cache_from_config(get_config(), BASE_DIR))
+
+def get_metrics():
+    """Per-stage timings and token usage, tagged by file, mode, chunk and action."""
+    return _lazy("METRICS", lambda: metrics_from_config(get_config(), BASE_DIR))
+
+def get_api():
+    """Retries and rate limiting for every Gemini call, shared by all chunks, actions and jobs."""
+    return _lazy("API", lambda: executor_from_config(get_config()))
+
+def get_uploads():
+    """Remote transcript/audio uploads, shared by every chunk and action (and every job in the monitor).
+
+    The manager gets its client from get_client(), which is only called once a request
+    actually has to be sent.
+    """
+    return _lazy("UPLOADS", lambda: UploadManager(client, os.path.join(BASE_DIR, "uploads.json"), executor=get_api()))
+
+def get_client():
+    """Returns the client for every upload and generate call, creating it on first use."""
+    if client is None:
+        with _init_lock:
+            if client is None:
+                _attach_client(create_client())
+    return client
+
+def _attach_client(new_client):
+    global client
+    client = new_client
+    if UPLOADS is not None:
+        UPLOADS.client = new_client
+
+# Transcripts up to this size are sent inline in the request instead of through the Files API
+DEFAULT_INLINE_TRANSCRIPT_MAX_KB = 200
+
+# How the running job sends generate requests (see run_job): "interactive", "batch" or "stub"
+BACKENDS = ("interactive", "batch", "stub")
+_current_backend = contextvars.ContextVar("backend", default="interactive")
+
+_batch_collectors = {}
+_batch_collectors_lock = threading.Lock()
+
+def _batch_collector(backend):
+    """Returns the BatchCollector shared by every job using the batch (or offline stub) backend."""
+    stub = backend == "stub"
+    # Resolved before taking the lock: building the client takes _init_lock
+    batches = StubBatches() if stub else get_client().batches
+    executor = None if stub else get_api()
+    with _batch_collectors_lock:
+        if backend not in _batch_collectors:
+            settings = get_config().get("general", {}).get("batch", {})
+            _batch_collectors[backend] = BatchCollector(
+                batches,
+                # Responses are handed back whole so token usage is recorded in the caller's context
+                lambda response: response,
+                executor=executor,
+                flush_seconds=0 if stub else settings.get("flush_seconds", 60),
+                max_requests=settings.get("max_requests", 50),
+                poll_seconds=0 if stub else settings.get("poll_seconds", 30),
+                timeout_seconds=settings.get("timeout_hours", 24) * 3600,
+            )
+        return _batch_collectors[backend]
+
+def set_client(new_client):
+    """Replaces the client used for every upload and generate call (e.g. with a FakeClient)."""
+    _attach_client(new_client)
+    # Collectors built for the previous client submit to its batches API
+    with _batch_collectors_lock:
+        _batch_collectors.clear()
+
+def _mode_backend(mode):
+    """Returns the backend configured for a mode (mode names match case-insensitively)."""
+    for name, mode_config in get_config().get("modes", {}).items():
+        if name.lower() == (mode or "").lower():
+            return mode_config.get("backend", "interactive")
+    return "interactive"
+
+# Set once run_actions has given up on the action running in this context (see run_actions)
+_abandoned = contextvars.ContextVar("abandoned", default=None)
+
+def _check_abandoned():
+    """Stops an action that timed out before it writes output the failed job no longer expects."""
+    event = _abandoned.get()
+    if event is not None and event.is_set():
+        raise RuntimeError("Action timed out; discarding its late output.")
+
+def _write_output(output_path, text):
+    _check_abandoned()
+    with get_metrics().span("write"):
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def _transcript_content(transcript_path):
+    """Returns the transcript text itself when it is small enough to send inline, else None."""
+    max_kb = get_config().get("general", {}).get("inline_transcript_max_kb", DEFAULT_INLINE_TRANSCRIPT_MAX_KB)
+    size = os.path.getsize(transcript_path)
+    if size > max_kb * 1024:
+        print(f"Sending {transcript_path} via upload ({size / 1024:.0f} KB > {max_kb} KB).")
+        return None
+    print(f"Sending {transcript_path} inline ({size / 1024:.0f} KB).")
+    with open(transcript_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def _partial_path(output_path):
+    return f"{os.path.splitext(output_path)[0]}.partial.txt"
+
+def _stream_to_file(model_name, contents, stream_path):
+    """Streams a response next to stream_path as it arrives and returns the full text.
+
+    The text goes to a sibling *.partial.txt file, never to stream_path itself, so
+    a failed or timed-out call leaves the last good output alone. The partial file
+    is flushed after every piece, so whatever was generated stays on disk if the
+    call dies part-way; it is removed once the call succeeds.
+    """
+    started = time.monotonic()
+    parts = []
+    usage_chunk = None
+    partial_path = _partial_path(stream_path)
+    with open(partial_path, "w", encoding="utf-8") as f:
+        for chunk in get_client().models.generate_content_stream(model=model_name, contents=contents):
+            if getattr(chunk, "usage_metadata", None):
+                usage_chunk = chunk  # The last chunk carries the totals
+            _check_abandoned()
+            text = _extract_text_from_response(chunk)
+            if not text:
+                continue
+            if not parts:
+                print(f"First token for {os.path.basename(stream_path)} after {time.monotonic() - started:.1f}s")
+            parts.append(text)
+            f.write(text)
+            f.flush()
+    print(f"Streamed {os.path.basename(stream_path)} in {time.monotonic() - started:.1f}s")
+    os.remove(partial_path)
+    get_metrics().record_usage(usage_chunk, model_name)
+    return "".join(parts)
+
+def _generate_text(prompt, input_path, model_name, allow_inline=False, stream_path=None, input_id=None, prepare=None):
+    """Runs the prompt against an input file, reusing cached responses when possible.
+
+    For an input that still has to be made (e.g. an audio chunk), pass prepare,
+    which creates input_path, and input_id, which identifies the input in the
+    cache (see ResultCache.make_key). prepare only runs on a cache miss.
+
+    With allow_inline (text inputs only), small files are embedded in the request
+    instead of being uploaded first. When general.streaming is enabled and a
+    stream_path is given, the response is written to that file as it is generated.
+    Jobs on the batch or stub backend send the request through a BatchCollector
+    and block until its batch has finished (no streaming).
+    """
+    backend = _current_backend.get()
+    cache = get_result_cache()
+    cache_key = None
+    # Placeholder answers from the offline stub must never end up in the cache
+    if cache.enabled and backend != "stub":
+        cache_key = cache.make_key(input_path, prompt, model_name, input_id=input_id)
+        cached_text = cache.get(cache_key)
+        if cached_text:
+            print(f"Using cached response for {input_path}")
+            return cached_text
+
+    if prepare:
+        prepare()
+
+    input_content = _transcript_content(input_path) if allow_inline else None
+    if input_content is None and backend == "stub":
+        # The offline stub never touches the network, so nothing is uploaded
+        input_content = f"(contents of {os.path.basename(input_path)})"
+    elif input_content is None:
+        get_client()  # Also hands the client to the upload manager
+        with get_metrics().span("upload"):
+            input_content = get_uploads().upload(input_path)
+
+    with get_metrics().span("generate"):
+        if backend != "interactive":
+            response = _batch_collector(backend).generate(model_name, [prompt, input_content])
+            get_metrics().record_usage(response, model_name)
+            text = _extract_text_from_response(response)
+        elif stream_path and get_config().get("general", {}).get("streaming", False):
+            text = get_api().call(_stream_to_file, model_name, [prompt, input_content], stream_path)
+        else:
+            response = get_api().call(
+                get_client().models.generate_content,
+                model=model_name,
+                contents=[prompt, input_content],
+            )
+            get_metrics().record_usage(response, model_name)
+            text = _extract_text_from_response(response)
+
+    if text and cache_key:
+        cache.put(cache_key, text)
+    return text
 
-def _transcribe_segment(file_path, speakers_list, model_name, prompt_key="transcription_podcast"):
-    """Helper function to transcribe a single audio file."""
-    print(f"Uploading file {file_path}...")
-    podcast_file = client.files.upload(file=file_path)
+def _transcribe_segment(file_path, speakers_list, model_name, prompt_key="transcription_podcast", stream_path=None, input_id=None, prepare=None):
+    """Helper function to transcribe a single audio file.
 
+    With streaming enabled, the transcript is written to stream_path while it is generated.
+    input_id and prepare are passed on to _generate_text, for audio that is only exported on a cache miss.
+    """
     default_prompt_podcast = """Generate a transcript of the episode. The episode is in Hebrew. Include timestamps and identify speakers.
 Speakers are: 
 {% for speaker in speakers %}- {{ speaker }}{% if not loop.last %}\\n{% endif %}{% endfor %}
@@ -108,22 +349,15 @@ It is important that you use the correct words and spell everything correctly. U
     if prompt_key == "transcription_workshop":
         default_prompt = default_prompt_workshop
         prompt_str = get_prompt(prompt_key, default_prompt)
-        prompt_template = Template(prompt_str)
-        prompt = prompt_template.render()
+        prompt = render_prompt(prompt_str)
     else:
         # Default fallback to podcast if key unknown, or if explicit podcast key
         default_prompt = default_prompt_podcast
         prompt_str = get_prompt(prompt_key, default_prompt)
-        prompt_template = Template(prompt_str)
-        prompt = prompt_template.render(speakers=speakers_list)
+        prompt = render_prompt(prompt_str, speakers=speakers_list)
 
     print("Generating transcript...")
-    response = client.models.generate_content(
-        model=model_name,
-        contents=[prompt, podcast_file],
-    )
-
-    text = _extract_text_from_response(response)
+    text = _generate_text(prompt, file_path, model_name, stream_path=stream_path, input_id=input_id, prepare=prepare)
     if not text:
         raise RuntimeError(f"Empty text from model response during transcription of {file_path}.")
     
@@ -132,53 +366,104 @@ It is important that you use the correct words and spell everything correctly. U
 
 def adjust_timestamps(text, offset_seconds):
     """Adjusts timestamps in the text by adding offset_seconds."""
-    def replace_match(match):
-        timestamp_str = match.group(1)
-        parts = list(map(int, timestamp_str.split(':')))
-        
-        if len(parts) == 2:
-            minutes, seconds = parts
-            hours = 0
-        elif len(parts) == 3:
-            hours, minutes, seconds = parts
-        else:
-            return match.group(0) # Should not happen given regex
-            
-        total_seconds = hours * 3600 + minutes * 60 + seconds
-        total_seconds += offset_seconds
-        
-        new_hours = int(total_seconds // 3600)
-        new_minutes = int((total_seconds % 3600) // 60)
-        new_seconds = int(total_seconds % 60)
-        
-        if new_hours > 0:
-            return f"[{new_hours:02d}:{new_minutes:02d}:{new_seconds:02d}]"
-        else:
-            return f"[{new_minutes:02d}:{new_seconds:02d}]"
+    return shift_timestamps(text, offset_seconds)
 
-    # Regex to match [MM:SS] or [HH:MM:SS]
-    # We look for square brackets containing digits and colons
-    return re.sub(r'\[(\d{1,2}:\d{2}(?::\d{2})?)\]', replace_match, text)
 
+def _audio_encoding(podcast_path, duration_seconds):
+    """Returns the extract_segment encoding options for the audio we upload, or None to stream-copy.
 
-def transcribe_audio(podcast_path, speakers_list, model_name, output_path, prompt_key="transcription_podcast"):
-    """Uploads an audio file and generates a transcript. Handles splitting for long files."""
+    With general.preprocess enabled the audio is always downmixed, resampled and
+    re-encoded with a compact speech codec. Otherwise it is only re-encoded to
+    150k MP3 when the source bitrate is high (> 160kbps).
+    """
+    preprocess = get_config().get("general", {}).get("preprocess", {})
+    if preprocess.get("enabled", False):
+        return {
+            "codec": preprocess.get("codec", "opus"),
+            "bitrate": preprocess.get("bitrate", "32k"),
+            "channels": preprocess.get("channels", 1),
+            "sample_rate": preprocess.get("sample_rate", 16000),
+        }
+
+    TARGET_BITRATE = "150k"
+    file_size = os.path.getsize(podcast_path)
+    bitrate_bps = (file_size * 8) / duration_seconds if duration_seconds > 0 else 0
+    if bitrate_bps > 160000:
+        print(f"File bitrate approx {int(bitrate_bps/1000)}kbps. Compressing to {TARGET_BITRATE}...")
+        return {"codec": "mp3", "bitrate": TARGET_BITRATE}
+    return None
+
+
+def _describe_encoding(encoding):
+    if not encoding:
+        return "stream copy"
+    details = [encoding["codec"], encoding.get("bitrate")]
+    if encoding.get("channels") == 1:
+        details.append("mono")
+    if encoding.get("sample_rate"):
+        details.append(f"{encoding['sample_rate']} Hz")
+    return " ".join(d for d in details if d)
+
+
+def transcribe_audio(podcast_path, speakers_list, model_name, output_path, prompt_key="transcription_podcast", max_parallel_chunks=None, journal=None):
+    """Uploads an audio file and generates a transcript. Handles splitting for long files.
+
+    Chunks of long files are processed concurrently, bounded by max_parallel_chunks
+    (defaults to general.max_parallel_chunks in config.json). With a JobJournal,
+    every finished chunk is checkpointed and chunks finished by an earlier run
+    are reused.
+    """
     print(f"--- Starting Transcription for {podcast_path} (Key: {prompt_key}) ---")
     
+    # Only the container metadata is read here; the audio itself is never decoded in memory
     try:
-        audio = AudioSegment.from_file(podcast_path)
+        with get_metrics().span("probe"):
+            duration_ms = int(probe_duration(podcast_path) * 1000)
     except Exception as e:
         print(f"Error loading audio file: {e}")
         raise
 
-    duration_ms = len(audio)
-    # Threshold: 50 minutes to be safe (Gemini 2.5 limit is around 1 hour)
-    CHUNK_LENGTH_MS = 50 * 60 * 1000 
+    # Optionally trim leading and trailing silence; timestamps stay relative to the original file
+    chunking = get_config().get("general", {}).get("chunking", {})
+    preprocess = get_config().get("general", {}).get("preprocess", {})
+    audio_start, audio_end = 0.0, duration_ms / 1000
+    if preprocess.get("enabled", False) and preprocess.get("trim_silence", False):
+        with get_metrics().span("plan"):
+            audio_start, audio_end = find_speech_bounds(
+                podcast_path,
+                duration_ms / 1000,
+                noise_db=chunking.get("silence_threshold_db", -35),
+                min_silence_seconds=chunking.get("min_silence_seconds", 0.5),
+            )
+        if audio_start > 0 or audio_end < duration_ms / 1000:
+            print(f"Trimming silence: keeping {audio_start:.1f}s to {audio_end:.1f}s.")
+
+    # Chunk count and length come from the configured policy (see choose_chunking).
+    # Chunks are at most 50 minutes by default, to be safe (Gemini 2.5 limit is around 1 hour)
+    get_metrics().record_audio(audio_end - audio_start)
+    if max_parallel_chunks is None:
+        max_parallel_chunks = get_config().get("general", {}).get("max_parallel_chunks", 1)
+    num_chunks, chunk_seconds = choose_chunking(
+        audio_end - audio_start,
+        policy=chunking.get("policy", "balanced"),
+        parallelism=max_parallel_chunks,
+        max_chunk_seconds=chunking.get("max_chunk_minutes", 50) * 60,
+        min_chunk_seconds=chunking.get("min_chunk_minutes", 10) * 60,
+        split_threshold_seconds=chunking.get("split_threshold_minutes", 60) * 60,
+    )
     
-    # Check bitrate logic
-    file_size = os.path.getsize(podcast_path)
-    bitrate_bps = (file_size * 8) / (duration_ms / 1000) if duration_ms > 0 else 0
-    TARGET_BITRATE = "150k"
+    # Re-encode (or preprocess) only when needed; otherwise stream-copy the original codec
+    encoding = _audio_encoding(podcast_path, duration_ms / 1000)
+    chunk_ext = codec_extension(encoding["codec"]) if encoding else os.path.splitext(podcast_path)[1]
+
+    # Exported audio is identified in the result cache by its source and how it is cut
+    # and encoded, so a repeat run finds its transcripts without exporting anything
+    source_hash = hash_file(podcast_path) if get_result_cache().enabled else None
+
+    def segment_id(start_seconds, duration_seconds):
+        if not source_hash:
+            return None
+        return f"{source_hash}:{start_seconds:.3f}+{duration_seconds}:{sorted((encoding or {}).items())}"
     
     transcript_parts = []
     
@@ -186,62 +471,144 @@ def transcribe_audio(podcast_path, speakers_list, model_name, output_path, promp
     transcriptions_dir = os.path.dirname(output_path)
     base_filename = os.path.splitext(os.path.basename(podcast_path))[0]
     
-    if duration_ms > 60 * 60 * 1000: # If > 1 hour
-        print(f"Audio is {duration_ms/1000/60:.2f} minutes long. Splitting into chunks...")
-        
-        num_chunks = math.ceil(duration_ms / CHUNK_LENGTH_MS)
-        
-        for i in range(num_chunks):
-            start_ms = i * CHUNK_LENGTH_MS
-            end_ms = min((i + 1) * CHUNK_LENGTH_MS, duration_ms)
-            
-            chunk = audio[start_ms:end_ms]
-            # Save chunks in the Transcriptions directory
-            chunk_filename = os.path.join(transcriptions_dir, f"{base_filename}_part{i+1}.mp3")
-            print(f"Exporting chunk {i+1}/{num_chunks}: {chunk_filename} ({TARGET_BITRATE})...")
-            chunk.export(chunk_filename, format="mp3", bitrate=TARGET_BITRATE)
-            
-            print(f"Transcribing chunk {i+1}/{num_chunks}...")
-            part_text = _transcribe_segment(chunk_filename, speakers_list, model_name, prompt_key=prompt_key)
-            
-            # Adjust timestamps for chunks after the first one
-            # (Actually, we can run it for all, with offset 0 for the first one, but let's be explicit)
-            offset_seconds = int(start_ms / 1000)
+    # Chunks and compressed copies are written to a scratch directory outside the
+    # (often synced) Transcriptions folder, and removed when the transcription ends
+    scratch_root = get_config().get("general", {}).get("scratch_dir") or None
+    with tempfile.TemporaryDirectory(prefix=f"{base_filename}_", dir=scratch_root) as scratch_dir:
+        if num_chunks > 1:
+            print(f"Audio is {duration_ms/1000/60:.2f} minutes long. Splitting into {num_chunks} chunks of about {chunk_seconds/60:.1f} minutes...")
+
+            # Cut at silences near every chunk boundary, each chunk starting a little early
+            with get_metrics().span("plan"):
+                chunks = plan_chunks(
+                    podcast_path,
+                    audio_end - audio_start,
+                    num_chunks,
+                    chunk_seconds,
+                    overlap_seconds=chunking.get("overlap_seconds", 10),
+                    silence_search_seconds=chunking.get("silence_search_seconds", 60),
+                    noise_db=chunking.get("silence_threshold_db", -35),
+                    min_silence_seconds=chunking.get("min_silence_seconds", 0.5),
+                    start_seconds=audio_start,
+                )
+            max_parallel_chunks = max(1, min(int(max_parallel_chunks), num_chunks))
+
+            def process_chunk(i):
+                with metrics.tags(chunk=i + 1):
+                    return _process_chunk(i)
+
+            def _process_chunk(i):
+                start_seconds, end_seconds, _ = chunks[i]
+                start_ms = int(start_seconds * 1000)
+                end_ms = int(end_seconds * 1000)
+
+                chunk_key = f"{prompt_key}:{start_ms}-{end_ms}"
+                if journal:
+                    saved_text = journal.get_chunk(chunk_key)
+                    if saved_text:
+                        print(f"Chunk {i+1}/{num_chunks} already transcribed, resuming from journal.")
+                        return Transcript.parse(saved_text)
+
+                # Save chunks in the scratch directory
+                chunk_filename = os.path.join(scratch_dir, f"{base_filename}_part{i+1}{chunk_ext}")
+
+                def export_chunk():
+                    print(f"Exporting chunk {i+1}/{num_chunks}: {chunk_filename} ({_describe_encoding(encoding)})...")
+                    with get_metrics().span("export"):
+                        extract_segment(
+                            podcast_path,
+                            chunk_filename,
+                            start_seconds=start_ms / 1000,
+                            duration_seconds=(end_ms - start_ms) / 1000,
+                            **(encoding or {}),
+                        )
+
+                print(f"Transcribing chunk {i+1}/{num_chunks}...")
+                # While it streams, this chunk's output goes to X_partN.partial.txt (see _stream_to_file)
+                stream_path = os.path.join(transcriptions_dir, f"{base_filename}_part{i+1}.txt")
+                part_text = _transcribe_segment(
+                    chunk_filename, speakers_list, model_name, prompt_key=prompt_key, stream_path=stream_path,
+                    input_id=segment_id(start_ms / 1000, (end_ms - start_ms) / 1000), prepare=export_chunk,
+                )
+                # The chunk is uploaded by now (if it was needed at all); free the scratch space early
+                if os.path.exists(chunk_filename):
+                    os.remove(chunk_filename)
+
+                # Parse once, then move the chunk's timestamps to the full recording
+                part = Transcript.parse(part_text)
+                offset_seconds = round(start_seconds)
+                if offset_seconds > 0:
+                    print(f"Adjusting timestamps by {offset_seconds} seconds...")
+                    part = part.shifted(offset_seconds)
+
+                if journal:
+                    journal.save_chunk(chunk_key, part.to_text())
+
+                return part
+
+            # Chunks are exported, uploaded and transcribed concurrently; results are
+            # collected in chunk order so the merge matches the sequential path.
+            print(f"Processing {num_chunks} chunks with up to {max_parallel_chunks} in parallel...")
+            with ThreadPoolExecutor(max_workers=max_parallel_chunks) as executor:
+                # Each chunk runs in a copy of this context so its uploads count towards the current job
+                futures = [executor.submit(contextvars.copy_context().run, process_chunk, i) for i in range(num_chunks)]
+                transcript_parts.extend(future.result() for future in futures)
+
+            # Drop the captions each chunk repeats from the overlap, and the intermediate [END] tags
+            with get_metrics().span("merge"):
+                transcript = merge_transcripts(transcript_parts, [keep_from for _, _, keep_from in chunks])
+
+        else:
+            print(f"Audio is {duration_ms/1000/60:.2f} minutes long. Transcribing it in one piece.")
+            file_to_transcribe = podcast_path
+            trimmed = audio_start > 0 or audio_end < duration_ms / 1000
+            input_id = export = None
+
+            # Compress, preprocess or trim into a new file (on a cache miss); otherwise upload the original as-is
+            if encoding or trimmed:
+                 # Save compressed file in the scratch directory
+                 compressed_path = os.path.join(scratch_dir, f"{base_filename}_compressed{chunk_ext}")
+                 duration_seconds = audio_end - audio_start if trimmed else None
+
+                 def export():
+                     with get_metrics().span("export"):
+                         extract_segment(
+                             podcast_path,
+                             compressed_path,
+                             start_seconds=audio_start,
+                             duration_seconds=duration_seconds,
+                             **(encoding or {}),
+                         )
+                     print(f"Compressed file saved to {compressed_path} ({_describe_encoding(encoding)})")
+
+                 file_to_transcribe = compressed_path
+                 input_id = segment_id(audio_start, duration_seconds)
+
+            print(f"Transcribing {file_to_transcribe}...")
+            text = _transcribe_segment(
+                file_to_transcribe, speakers_list, model_name, prompt_key=prompt_key, stream_path=output_path,
+                input_id=input_id, prepare=export,
+            )
+            transcript = Transcript.parse(text)
+
+            offset_seconds = round(audio_start)
             if offset_seconds > 0:
                 print(f"Adjusting timestamps by {offset_seconds} seconds...")
-                part_text = adjust_timestamps(part_text, offset_seconds)
-            
-            transcript_parts.append(part_text)
-            
-    else:
-        print("Audio is under 1 hour.")
-        file_to_transcribe = podcast_path
-        
-        # If bitrate is high (> 160kbps), compress
-        if bitrate_bps > 160000:
-             print(f"File bitrate approx {int(bitrate_bps/1000)}kbps. Compressing to {TARGET_BITRATE}...")
-             # Save compressed file in the Transcriptions directory
-             compressed_path = os.path.join(transcriptions_dir, f"{base_filename}_compressed.mp3")
-             
-             audio.export(compressed_path, format="mp3", bitrate=TARGET_BITRATE)
-             print(f"Compressed file saved to {compressed_path}")
-             file_to_transcribe = compressed_path
-        
-        print(f"Transcribing {file_to_transcribe}...")
-        text = _transcribe_segment(file_to_transcribe, speakers_list, model_name, prompt_key=prompt_key)
-        transcript_parts.append(text)
+                transcript = transcript.shifted(offset_seconds)
 
-    full_transcript = "\\n".join(transcript_parts)
-    
-    # Remove intermediate [END] tags if present, keeping only the last one if desired.
-    # For now, we'll just join them. The user can edit if needed.
-    
+    full_transcript = transcript.to_text()
     print(f"RAW RESPONSE (Merged): {full_transcript[:500]}...") # Print start of merged text
     
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(full_transcript)
+    _write_output(output_path, full_transcript)
 
     print(f"Transcription saved to {output_path}")
+
+    # Subtitle / structured copies next to the transcript, e.g. X_Transcription.srt
+    caption_formats = get_config().get("general", {}).get("caption_formats", [])
+    with get_metrics().span("write"):
+        caption_paths = export_transcript(transcript, os.path.splitext(output_path)[0], caption_formats)
+    for path in caption_paths:
+        print(f"Captions saved to {path}")
     return output_path
 
 
@@ -249,8 +616,6 @@ def generate_linkedin_post(transcript_path, model_name, output_path):
     """Generates a LinkedIn post based on a transcript file."""
     print(f"--- Generating LinkedIn Post from {transcript_path} ---")
     
-    transcript_file =  client.files.upload(file=transcript_path)
-
     default_prompt = """אתה כותב עבור פודקאסט בשם "נקודה למחשבה" בהנחיית אדי שמיטנקה.
 הפודקאסט פונה לאנשים רציונליים, סקרנים, בעלי צורך בהתפתחות אישית ובחשיבה עצמאית. רובם מגיעים מעולמות לוגיים או אנליטיים (כמו הייטק, מדעים, הנדסה, עיתונאות), צורכים הרבה ידע (פודקאסטים, ספרים, סרטונים) אך לא תמיד מיישמים, וחווים תחושות של עומס, בלבול או חוסר מימוש.
 הם מעריכים גישה פרקטית, שיחה בגובה העיניים, ונרתעים משיח קלישאתי או "רוחני מדי".
@@ -277,17 +642,11 @@ def generate_linkedin_post(transcript_path, model_name, output_path):
 
     print("Generating LinkedIn post...")
 
-    response = client.models.generate_content(
-        model=model_name,
-        contents=[linkedin_prompt, transcript_file],
-    )
-
-    text = _extract_text_from_response(response)
+    text = _generate_text(linkedin_prompt, transcript_path, model_name, allow_inline=True, stream_path=output_path)
     if not text:
         raise RuntimeError("Empty text from model response for LinkedIn post.")
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(text)
+    _write_output(output_path, text)
         
     print(f"LinkedIn post saved to {output_path}")
 
@@ -296,8 +655,6 @@ def generate_description(transcript_path, speakers_list, model_name, output_path
     """Generates an episode description based on a transcript file."""
     print(f"--- Generating Episode Description from {transcript_path} ---")
     
-    transcript_file =  client.files.upload(file=transcript_path)
-
     default_prompt = f"""Here's the full transcript of an episode from my podcast 'נקודה למחשבה' – a show that sparks new ways of thinking about everyday life. The audience is mostly logical, analytical individuals, often from fields like tech, who appreciate thought-provoking content that challenges assumptions and helps them reflect on how to live more intentionally. Please write a compelling episode description that meets the following criteria:
 The description should be in Hebrew. Only use characters from the Hebrew alphabet, unless you genuinely believe foreign characters are correct.
 Opens with a strong, curiosity-driven hook that encourages people to listen
@@ -315,22 +672,15 @@ The timestamps should in a format like "00:00 - Intro" - with no "**" for bold t
     # To support external config, we should treat it as a Jinja2 template.
     # The user config should contain Jinja2 placeholders like {{ speakers_list[0] }}
     
-    prompt_template = Template(prompt_str)
-    descpt_prompt = prompt_template.render(speakers_list=speakers_list)
+    descpt_prompt = render_prompt(prompt_str, speakers_list=speakers_list)
 
     print("Generating episode description...")
     
-    response = client.models.generate_content(
-        model=model_name,
-        contents=[descpt_prompt, transcript_file],
-    )
-
-    text = _extract_text_from_response(response)
+    text = _generate_text(descpt_prompt, transcript_path, model_name, allow_inline=True, stream_path=output_path)
     if not text:
         raise RuntimeError("Empty text from model response for episode description.")
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(text)
+    _write_output(output_path, text)
         
     print(f"Episode description saved to {output_path}")
 
@@ -338,8 +688,6 @@ def generate_summary(transcript_path, speakers_list, model_name, output_path):
     """Generates an transcript summary based on a transcript file."""
     print(f"--- Generating Trasnscript Summary from {transcript_path} ---")
     
-    transcript_file =  client.files.upload(file=transcript_path)
-
     default_prompt = """Here's the full transcript of an conversation. Please write a summary that includes the key talking points, things to remember, important notes.
 The summary should be in Hebrew. Only use characters from the Hebrew alphabet, unless you genuinely believe foreign characters are correct.
 Since the conversation was conducted in zoom and might have included visuals, include timestamps where you deem relevant.
@@ -349,17 +697,11 @@ Since the conversation was conducted in zoom and might have included visuals, in
 
     print("Generating transcript summary...")
     
-    response = client.models.generate_content(
-        model=model_name,
-        contents=[descpt_prompt, transcript_file],
-    )
-
-    text = _extract_text_from_response(response)
+    text = _generate_text(descpt_prompt, transcript_path, model_name, allow_inline=True, stream_path=output_path)
     if not text:
         raise RuntimeError("Empty text from model response for transcript summary.")
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(text)
+    _write_output(output_path, text)
         
     print(f"Transcript summary saved to {output_path}")
 
@@ -368,8 +710,6 @@ def generate_sales_feedback(transcript_path, model_name, output_path):
     """Generates sales feedback based on a transcript file."""
     print(f"--- Generating Sales Feedback from {transcript_path} ---")
     
-    transcript_file = client.files.upload(file=transcript_path)
-
     system_prompt = get_prompt("sales_feedback_system", "")
     user_prompt = get_prompt("sales_feedback_user", "")
     
@@ -377,98 +717,228 @@ def generate_sales_feedback(transcript_path, model_name, output_path):
 
     print("Generating sales feedback...")
     
-    response = client.models.generate_content(
-        model=model_name,
-        contents=[full_prompt, transcript_file],
-    )
-
-    text = _extract_text_from_response(response)
+    text = _generate_text(full_prompt, transcript_path, model_name, allow_inline=True, stream_path=output_path)
     if not text:
         raise RuntimeError("Empty text from model response for sales feedback.")
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(text)
+    _write_output(output_path, text)
         
     print(f"Sales feedback saved to {output_path}")
 
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Process podcast audio files.")
-    parser.add_argument("--file", required=True, help="Path to the input audio file")
-    # Remove strict choices to allow custom config modes (e.g. "Draft", "Guest") which fallback to PODCAST defaults
-    parser.add_argument("--mode", default="PODCAST", help="Processing mode")
-    parser.add_argument("--speakers", nargs="+", default=[], help="List of speakers")
-    parser.add_argument("--transcribe-only", action="store_true", help="Only transcribe the audio, skip generation tasks (Deprecated, use --actions)")
-    parser.add_argument("--actions", nargs="+", default=["transcribe_podcast", "summary", "linkedin", "description"], help="List of actions to perform")
-    
-    args = parser.parse_args()
-    
-    # Configuration derived from arguments
-    PODCAST_FILE_PATH = args.file
-    MODE = args.mode
-    SPEAKERS = args.speakers
+# Model
+MODEL = "gemini-3-flash-preview"
+
+# Seconds to wait for a generation action before giving up on it
+DEFAULT_ACTION_TIMEOUT = 600
+
+
+def get_action_timeout(action):
+    if _current_backend.get() != "interactive":
+        # Batches can take hours; BatchCollector enforces general.batch.timeout_hours instead
+        return None
+    timeouts = get_config().get("general", {}).get("action_timeouts", {})
+    return timeouts.get(action, timeouts.get("default", DEFAULT_ACTION_TIMEOUT))
+
+
+def _run_into(future, fn):
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        future.set_result(fn())
+    except BaseException as e:
+        future.set_exception(e)
+
+
+def run_actions(tasks):
+    """Runs independent actions concurrently, each with its own timeout.
+
+    tasks maps an action name to a zero-argument callable. A failing or timed-out
+    action is reported but does not stop the others. Returns the names of the
+    actions that did not complete.
+
+    A running request cannot be interrupted, so a timed-out action's thread may
+    outlive the timeout. It is marked abandoned: it stops streaming and does not
+    write its output file or record itself as done (see _check_abandoned). Its
+    thread is a daemon, so it does not keep the process alive either.
+    """
+    if not tasks:
+        return []
+
+    started = time.monotonic()
+    futures, abandoned = {}, {}
+    for name, task in tasks.items():
+        abandoned[name] = threading.Event()
+        context = contextvars.copy_context()
+        context.run(_abandoned.set, abandoned[name])
+        futures[name] = Future()
+        threading.Thread(
+            target=_run_into, args=(futures[name], lambda context=context, task=task: context.run(task)),
+            name=f"action-{name}", daemon=True,
+        ).start()
+
+    failed = []
+    # Every action starts immediately, so each one's deadline is measured from the same start time
+    timeouts = {name: get_action_timeout(name) for name in futures}
+    for name in sorted(futures, key=lambda name: float("inf") if timeouts[name] is None else timeouts[name]):
+        remaining = None if timeouts[name] is None else max(0, timeouts[name] - (time.monotonic() - started))
+        try:
+            futures[name].result(timeout=remaining)
+        except FuturesTimeoutError:
+            abandoned[name].set()
+            print(f"Action '{name}' timed out after {timeouts[name]} seconds.")
+            failed.append(name)
+        except Exception as e:
+            print(f"Action '{name}' failed: {e}")
+            failed.append(name)
+
+    # Don't block on timed-out actions; their threads finish (or fail) on their own
+    return failed
+
+
+def _checkpointed(journal, name, task, output_path):
+    """Wraps an action so its completion is recorded in the job journal."""
+    def run():
+        with metrics.tags(action=name), get_metrics().span("action"):
+            task()
+        _check_abandoned()
+        journal.mark_done(name, output_path)
+    return run
+
+
+def run_job(podcast_file_path, mode, speakers, actions, model_name=MODEL, backend=None):
+    """Runs the requested actions for one audio file.
+
+    This is what the command line entry point calls, and what the monitor's
+    worker pool calls in-process for every detected file. Files uploaded for the
+    job are deleted from the Files API once it completes.
+
+    backend overrides the mode's "backend" setting in config.json: "interactive"
+    calls the model directly, "batch" goes through the Batch API and "stub" is an
+    offline stand-in for the Batch API.
+    """
+    backend = backend or _mode_backend(mode)
+    if backend not in BACKENDS:
+        print(f"Warning: Unknown backend '{backend}', using 'interactive'.")
+        backend = "interactive"
+    token = _current_backend.set(backend)
+    success = False
+    try:
+        with metrics.tags(file=os.path.basename(podcast_file_path), mode=mode), get_metrics().span("job"):
+            with get_uploads().job():
+                _run_job(podcast_file_path, mode, speakers, actions, model_name)
+            success = True
+    finally:
+        _current_backend.reset(token)
+        with metrics.tags(mode=mode):
+            get_metrics().record_job(success)
+
+
+def _run_job(podcast_file_path, mode, speakers, actions, model_name):
     # Convert actions to lower case to handle potential case issues
-    ACTIONS = [a.lower() for a in args.actions]
-    
-    # Backward compatibility for transcribe-only
-    if args.transcribe_only:
-        ACTIONS = ["transcribe_podcast"]
-    
-    # Model
-    MODEL = "gemini-3-flash-preview"
-    
+    actions = [a.lower() for a in actions]
+
     # Output paths derived from input filename
-    directory = os.path.dirname(PODCAST_FILE_PATH)
-    filename_no_ext = os.path.splitext(os.path.basename(PODCAST_FILE_PATH))[0]
+    directory = os.path.dirname(podcast_file_path)
+    filename_no_ext = os.path.splitext(os.path.basename(podcast_file_path))[0]
     
     transcriptions_dir = os.path.join(directory, "Transcriptions")
     os.makedirs(transcriptions_dir, exist_ok=True)
     
     base_name = os.path.join(transcriptions_dir, filename_no_ext)
-    TRANSCRIPT_FILE_PATH = f"{base_name}_Transcription.txt"
-    LINKEDIN_POST_PATH = f"{base_name}_Linkedin.txt"
-    DESCRIPTION_PATH = f"{base_name}_Description.txt"
-    SUMMARY_PATH = f"{base_name}_Summary.txt"
-    SALES_FEEDBACK_PATH = f"{base_name}_SalesFeedback.txt"
+    transcript_file_path = f"{base_name}_Transcription.txt"
+    linkedin_post_path = f"{base_name}_Linkedin.txt"
+    description_path = f"{base_name}_Description.txt"
+    summary_path = f"{base_name}_Summary.txt"
+    sales_feedback_path = f"{base_name}_SalesFeedback.txt"
+
+    # Progress checkpoints, so a crashed or failed job resumes at the first unfinished step
+    journal = JobJournal(os.path.join(transcriptions_dir, f".{filename_no_ext}_journal.json"), podcast_file_path, model_name)
 
     # 1. Transcribe the audio file
     transcript_path = None
     
     # Determine transcription type
-    if "transcribe_podcast" in ACTIONS:
-        transcript_path = transcribe_audio(PODCAST_FILE_PATH, SPEAKERS, MODEL, TRANSCRIPT_FILE_PATH, prompt_key="transcription_podcast")
-    elif "transcribe_workshop" in ACTIONS:
-        transcript_path = transcribe_audio(PODCAST_FILE_PATH, SPEAKERS, MODEL, TRANSCRIPT_FILE_PATH, prompt_key="transcription_workshop")
-    elif os.path.exists(TRANSCRIPT_FILE_PATH):
+    prompt_key = None
+    if "transcribe_podcast" in actions:
+        prompt_key = "transcription_podcast"
+    elif "transcribe_workshop" in actions:
+        prompt_key = "transcription_workshop"
+
+    if prompt_key and journal.is_done("transcription", transcript_file_path):
+        print(f"Transcription already completed, using existing file: {transcript_file_path}")
+        transcript_path = transcript_file_path
+    elif prompt_key:
+        transcript_path = transcribe_audio(podcast_file_path, speakers, model_name, transcript_file_path, prompt_key=prompt_key, journal=journal)
+        journal.mark_done("transcription", transcript_path)
+    elif os.path.exists(transcript_file_path):
         # reuse existing if we are just re-running other steps
-        print(f"Skipping transcription, using existing file: {TRANSCRIPT_FILE_PATH}")
-        transcript_path = TRANSCRIPT_FILE_PATH
+        print(f"Skipping transcription, using existing file: {transcript_file_path}")
+        transcript_path = transcript_file_path
     else:
-        print("No transcription action selected and no existing transcript found. Cannot proceed with other steps.")
-        sys.exit(1)
+        raise RuntimeError("No transcription action selected and no existing transcript found. Cannot proceed with other steps.")
 
     if transcript_path:
-        # 2. Generate LinkedIn post
-        if "linkedin" in ACTIONS:
-            generate_linkedin_post(transcript_path, MODEL, LINKEDIN_POST_PATH)
+        # 2-5. The generation actions only depend on the transcript, so they run concurrently
+        tasks = {}
+        if "linkedin" in actions:
+            tasks["linkedin"] = (lambda: generate_linkedin_post(transcript_path, model_name, linkedin_post_path), linkedin_post_path)
         
-        # 3. Generate episode description
-        if "description" in ACTIONS:
+        if "description" in actions:
             # Ensure we have at least 2 speakers for the description prompt logic if needed, or handle gracefully
-            if len(SPEAKERS) >= 2:
-                 generate_description(transcript_path, SPEAKERS, MODEL, DESCRIPTION_PATH)
+            if len(speakers) >= 2:
+                 description_speakers = speakers
+            elif len(speakers) == 1:
+                 description_speakers = [speakers[0], "Audience"]
+            else:
+                 description_speakers = ["Host", "Guest"]
+            tasks["description"] = (lambda: generate_description(transcript_path, description_speakers, model_name, description_path), description_path)
+
+        if "summary" in actions:
+            tasks["summary"] = (lambda: generate_summary(transcript_path, speakers, model_name, summary_path), summary_path)
+
+        if "sales_feedback" in actions:
+            tasks["sales_feedback"] = (lambda: generate_sales_feedback(transcript_path, model_name, sales_feedback_path), sales_feedback_path)
+
+        pending = {}
+        for name, (task, output_path) in tasks.items():
+            if journal.is_done(name, output_path):
+                print(f"Skipping {name}, already completed: {output_path}")
             else:
-                 if len(SPEAKERS) == 1:
-                     generate_description(transcript_path, [SPEAKERS[0], "Audience"], MODEL, DESCRIPTION_PATH)
-                 else:
-                     generate_description(transcript_path, ["Host", "Guest"], MODEL, DESCRIPTION_PATH)
-
-        # 4. Generate transcript summary
-        if "summary" in ACTIONS:
-            generate_summary(transcript_path, SPEAKERS, MODEL, SUMMARY_PATH)
-
-        # 5. Generate Sales Feedback
-        if "sales_feedback" in ACTIONS:
-            generate_sales_feedback(transcript_path, MODEL, SALES_FEEDBACK_PATH)
+                pending[name] = _checkpointed(journal, name, task, output_path)
+
+        failed = run_actions(pending)
+        if failed:
+            raise RuntimeError(f"Some actions failed: {', '.join(failed)}")
         
         print("--- All requested tasks completed. ---")
+
+    journal.complete()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process podcast audio files.")
+    parser.add_argument("--file", required=True, help="Path to the input audio file")
+    # Remove strict choices to allow custom config modes (e.g. "Draft", "Guest") which fallback to PODCAST defaults
+    parser.add_argument("--mode", default="PODCAST", help="Processing mode")
+    parser.add_argument("--speakers", nargs="+", default=[], help="List of speakers")
+    parser.add_argument("--transcribe-only", action="store_true", help="Only transcribe the audio, skip generation tasks (Deprecated, use --actions)")
+    parser.add_argument("--actions", nargs="+", default=["transcribe_podcast", "summary", "linkedin", "description"], help="List of actions to perform")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached model responses and always call the API")
+    parser.add_argument("--backend", choices=BACKENDS, help="Override the mode's backend (batch/stub are for non-urgent or offline runs)")
+    
+    args = parser.parse_args()
+
+    if args.no_cache:
+        get_result_cache().enabled = False
+    
+    actions = args.actions
+    # Backward compatibility for transcribe-only
+    if args.transcribe_only:
+        actions = ["transcribe_podcast"]
+
+    try:
+        run_job(args.file, args.mode, args.speakers, actions, backend=args.backend)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
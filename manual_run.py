@@ -2,7 +2,7 @@ import argparse
 import os
 import sys
 import logging
-from monitor import process_file
+from monitor import process_file, load_config, determine_mode_and_actions
 
 # Setup logging to stdout for manual run
 logging.basicConfig(
@@ -24,11 +24,19 @@ def main():
         
     print(f"Starting manual processing for: {filepath}")
     
+    # Pick the mode and actions from the filename, like the monitor does
+    modes = (load_config() or {}).get("modes", {})
+    mode, actions = determine_mode_and_actions(os.path.basename(filepath), modes)
+    if not mode:
+        # Default to PODCAST mode for manual runs
+        mode = "PODCAST"
+        actions = ["transcribe_podcast", "summary", "linkedin", "description"]
+    print(f"Mode: {mode} | Actions: {actions}")
+
     # Reuse the process_file function from monitor.py
     # This handles speaker detection and calling main.py
     try:
-        # Default to PODCAST mode for manual runs, monitor's process_file handles the Draft check
-        process_file(filepath, mode="PODCAST")
+        process_file(filepath, mode, actions)
         print("Manual processing completed successfully.")
     except Exception as e:
         print(f"Error during processing: {e}")
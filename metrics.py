@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Tags (file, mode, chunk, action) of the work running in the current context
+_current_tags = contextvars.ContextVar("metric_tags", default={})
+
+# Tags that become Prometheus labels; the others (file, chunk) only appear in the JSON log
+LABELS = ("mode", "action")
+
+# usage_metadata field -> token type label
+TOKEN_FIELDS = {
+    "prompt_token_count": "prompt",
+    "candidates_token_count": "output",
+    "thoughts_token_count": "thoughts",
+    "cached_content_token_count": "cached",
+}
+
+
+@contextmanager
+def tags(**new_tags):
+    """Adds tags to every span and usage record made inside the block (including worker threads started with copy_context)."""
+    token = _current_tags.set({**_current_tags.get(), **new_tags})
+    try:
+        yield
+    finally:
+        _current_tags.reset(token)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """Per-stage timings, token usage and job counts for every job.
+
+    Each span and usage record is appended as one JSON line to json_log, tagged
+    with the file, mode, chunk and action it belongs to. Totals are kept as
+    counters and written in the Prometheus text format to prometheus_file (for
+    node_exporter's textfile collector) whenever a job finishes. Counters cover
+    the lifetime of the process, e.g. the monitor.
+    """
+
+    def __init__(self, json_log=None, prometheus_file=None, enabled=True):
+        self.json_log = json_log
+        self.prometheus_file = prometheus_file
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, sorted label items) -> value
+
+    def _add(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def _labels(self):
+        current = _current_tags.get()
+        return {label: current.get(label, "") for label in LABELS}
+
+    def _log(self, event, **fields):
+        if not self.json_log:
+            return
+        record = {"ts": datetime.now(timezone.utc).isoformat(), "event": event, **_current_tags.get(), **fields}
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.json_log, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    @contextmanager
+    def span(self, stage, **span_tags):
+        """Times the block as one stage (probe, plan, export, upload, generate, write, action, job)."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        ok = False
+        try:
+            with tags(**span_tags):
+                yield
+                ok = True
+        finally:
+            seconds = time.perf_counter() - started
+            with tags(**span_tags):
+                labels = self._labels()
+                self._add("stage_seconds_total", seconds, stage=stage, **labels)
+                self._add("stage_calls_total", 1, stage=stage, status="ok" if ok else "error", **labels)
+                self._log("span", stage=stage, seconds=round(seconds, 4), ok=ok)
+
+    def record_usage(self, response, model_name):
+        """Records the token counts of a model response (its usage_metadata), if it has any."""
+        usage = getattr(response, "usage_metadata", None)
+        if not self.enabled or usage is None:
+            return
+        counts = {}
+        for field, token_type in TOKEN_FIELDS.items():
+            value = getattr(usage, field, None)
+            if value:
+                counts[token_type] = value
+                self._add("tokens_total", value, model=model_name, type=token_type, **self._labels())
+        self._log("usage", model=model_name, **{f"{token_type}_tokens": value for token_type, value in counts.items()})
+
+    def record_audio(self, seconds):
+        """Counts audio that was transcribed, so cost and time can be expressed per audio-hour."""
+        if not self.enabled:
+            return
+        self._add("audio_seconds_total", seconds, **self._labels())
+        self._log("audio", seconds=round(seconds, 3))
+
+    def record_job(self, success):
+        if not self.enabled:
+            return
+        self._add("jobs_total", 1, status="success" if success else "failed", **self._labels())
+        self.write_prometheus()
+
+    def stage_totals(self):
+        """Returns {stage: (calls, seconds)} summed over all tags."""
+        totals = {}
+        with self._lock:
+            counters = list(self._counters.items())
+        for (name, labels), value in counters:
+            stage = dict(labels).get("stage")
+            if name not in ("stage_calls_total", "stage_seconds_total") or stage is None:
+                continue
+            calls, seconds = totals.get(stage, (0, 0.0))
+            if name == "stage_calls_total":
+                calls += value
+            else:
+                seconds += value
+            totals[stage] = (calls, seconds)
+        return totals
+
+    def write_prometheus(self):
+        if not self.enabled or not self.prometheus_file:
+            return
+        with self._lock:
+            counters = sorted(self._counters.items())
+        lines = []
+        seen = set()
+        for (name, labels), value in counters:
+            metric = f"transcription_{name}"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels)
+            lines.append(f"{metric}{{{label_text}}} {value}")
+        tmp_path = f"{self.prometheus_file}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.prometheus_file)
+
+
+def metrics_from_config(config, base_dir):
+    """Builds Metrics from the general.metrics section of config.json."""
+    settings = config.get("general", {}).get("metrics", {})
+
+    def resolve(path):
+        if path and not os.path.isabs(path):
+            return os.path.join(base_dir, path)
+        return path
+
+    return Metrics(
+        json_log=resolve(settings.get("json_log", "metrics.jsonl")),
+        prometheus_file=resolve(settings.get("prometheus_file", "metrics.prom")),
+        enabled=settings.get("enabled", False),
+    )
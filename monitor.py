@@ -1,16 +1,28 @@
 import os
+import sys
 import time
-import subprocess
+import queue
 import logging
 import json
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from watcher import FileWatcher
+from job_queue import JobQueue
+from processed_store import ProcessedStore
+from audio_tools import probe_duration
+from config_registry import CONFIG_PATH, get_registry
 
 load_dotenv()
 
+import main
+
 # Constants
-CONFIG_FILE = "config.json"
-PROCESSED_LOG = "processed_files.log"
+CONFIG_FILE = CONFIG_PATH  # Next to the scripts, the same file main.py reads
+PROCESSED_DB = "processed_files.db"
+PROCESSED_LOG = "processed_files.log"  # Older versions; imported into PROCESSED_DB once
+QUEUE_DB = "jobs.db"
 POLL_INTERVAL = 10  # Seconds
+AUDIO_EXTENSIONS = [".mp3", ".m4a", ".wav", ".flac"]
 
 # Setup logging
 logging.basicConfig(
@@ -22,25 +34,8 @@ logging.basicConfig(
 )
 
 def load_config():
-    try:
-        with open(CONFIG_FILE, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logging.error(f"Configuration file {CONFIG_FILE} not found.")
-        return None
-    except json.JSONDecodeError as e:
-        logging.error(f"Error parsing {CONFIG_FILE}: {e}")
-        return None
-
-def load_processed_files():
-    if not os.path.exists(PROCESSED_LOG):
-        return set()
-    with open(PROCESSED_LOG, "r") as f:
-        return set(line.strip() for line in f)
-
-def save_processed_file(filename):
-    with open(PROCESSED_LOG, "a") as f:
-        f.write(filename + "\n")
+    """Returns the current config.json (re-read only when it changes), or None if it never loaded."""
+    return get_registry(CONFIG_FILE).get()
 
 def get_speakers(filename, mode):
     # Logic:
@@ -74,34 +69,195 @@ def determine_mode_and_actions(filename, config_modes):
     
     return None, []
 
-def process_file(filepath, mode, actions, python_interpreter):
+def process_file(filepath, mode, actions):
+    """Runs main.run_job for one file in-process. Errors are logged and re-raised."""
     filename = os.path.basename(filepath)
     logging.info(f"Processing new file: {filename} | Mode: {mode} | Actions: {actions}")
     
     speakers = get_speakers(filename, mode)
     logging.info(f"Identified speakers: {speakers}")
     
-    # Construct command
-    # python main.py --file "path/to/file" --mode PODCAST --speakers "Speaker1" "Speaker2" --actions action1 action2
-    
-    cmd = [
-        python_interpreter, "-u", "main.py",
-        "--file", filepath,
-        "--mode", mode,
-        "--speakers"
-    ] + speakers + ["--actions"] + actions
-    
-    logging.info(f"Running command: {' '.join(cmd)}")
-    
     try:
-        subprocess.run(cmd, check=True)
+        main.run_job(filepath, mode, speakers, actions)
         logging.info(f"Successfully processed {filename}")
-        save_processed_file(filename)
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Error processing {filename}: {e}")
+    except Exception as e:
+        logging.exception(f"Error processing {filename}: {e}")
+        raise
+
+class WorkerPool:
+    """Persistent in-process workers, one thread pool per mode.
+
+    Every worker shares the already imported main module and its API client, so a
+    job pays no interpreter startup or import cost. Each mode runs up to its
+    "concurrency" setting in config.json (default 1) jobs at once; jobs are only
+    submitted when a slot is free (see dispatch_jobs), so waiting jobs stay in the
+    JobQueue where they can be reordered.
+    Finished jobs are reported through the completed queue as (job_id, filepath, st, error),
+    where st is the file's os.stat result from when the job was submitted.
+    """
+
+    def __init__(self):
+        self._pools = {}  # mode -> (concurrency, executor)
+        self.in_flight = set()
+        self.running = {}  # mode -> number of running jobs
+        self.completed = queue.Queue()
+
+    def _get_executor(self, mode, concurrency):
+        current = self._pools.get(mode)
+        if current and current[0] == concurrency:
+            return current[1]
+        if current:
+            # Concurrency changed in config.json; let running jobs finish on the old pool
+            current[1].shutdown(wait=False)
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"worker-{mode}")
+        self._pools[mode] = (concurrency, executor)
+        return executor
+
+    def submit(self, job_id, filepath, mode, actions, concurrency=1, st=None):
+        executor = self._get_executor(mode, max(1, int(concurrency)))
+        self.in_flight.add(filepath)
+        self.running[mode] = self.running.get(mode, 0) + 1
+        future = executor.submit(process_file, filepath, mode, actions)
+        future.add_done_callback(
+            lambda f: self.completed.put((job_id, filepath, mode, st, f.exception()))
+        )
+
+    def drain_completed(self):
+        """Returns the (job_id, filepath, st, error) of the jobs that finished since the last call."""
+        finished = []
+        while True:
+            try:
+                job_id, filepath, mode, st, error = self.completed.get_nowait()
+            except queue.Empty:
+                return finished
+            self.in_flight.discard(filepath)
+            self.running[mode] -= 1
+            finished.append((job_id, filepath, st, error))
+
+class StabilityGate:
+    """Holds detected files back until they have stopped changing.
+
+    A file is released once its size and mtime have stayed the same for
+    stable_seconds, and no lock file sits next to it (e.g. "Episode.mp3.lock" for
+    lock_suffixes [".lock"]). This keeps DAW exports and cloud syncs that are still
+    writing a file from being transcribed half-written.
+    """
+
+    def __init__(self, stable_seconds=30, lock_suffixes=()):
+        self.stable_seconds = stable_seconds
+        self.lock_suffixes = list(lock_suffixes)
+        self._waiting = {}  # path -> ((size, mtime_ns), time the key was first seen)
+
+    def add(self, filepath):
+        if filepath not in self._waiting:
+            self._waiting[filepath] = (None, time.monotonic())
+
+    def __len__(self):
+        return len(self._waiting)
+
+    def ready(self):
+        """Returns (and stops tracking) the waiting files that are now stable."""
+        now = time.monotonic()
+        released = []
+        for filepath, (key, since) in list(self._waiting.items()):
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                # Deleted or renamed; a rename shows up as a new path
+                del self._waiting[filepath]
+                continue
+            current = (st.st_size, st.st_mtime_ns)
+            if current != key:
+                self._waiting[filepath] = (current, now)
+            elif now - since >= self.stable_seconds and not self._is_locked(filepath):
+                del self._waiting[filepath]
+                released.append(filepath)
+        return released
+
+    def _is_locked(self, filepath):
+        return any(os.path.exists(filepath + suffix) for suffix in self.lock_suffixes)
+
+def is_candidate(filepath, config, processed):
+    """True if filepath is supported audio that matches a mode and is not processed yet."""
+    file = os.path.basename(filepath)
+    if os.path.splitext(file)[1].lower() not in AUDIO_EXTENSIONS:
+        return False
+    mode, _ = determine_mode_and_actions(file, config.get("modes", {}))
+    return bool(mode) and not processed.is_processed(filepath)
+
+def handle_candidate(filepath, config, processed, jobs):
+    """Adds a single detected file to the job queue if it is supported audio and not yet processed."""
+    file = os.path.basename(filepath)
+    ext = os.path.splitext(file)[1].lower()
+
+    if ext not in AUDIO_EXTENSIONS:
+        return
+
+    # Determine if we should process it
+    modes = config.get("modes", {})
+    mode, actions = determine_mode_and_actions(file, modes)
+    if not mode:
+        return
+
+    try:
+        if os.path.getsize(filepath) == 0:
+            return
+    except OSError:
+        # Deleted or renamed before we got to it
+        return
+
+    if processed.is_processed(filepath):
+        return
+
+    # Shortest recordings go first within a priority; an unreadable duration just sorts last
+    try:
+        duration = probe_duration(filepath)
+    except Exception:
+        duration = None
+
+    # Found a matching mode and file is not processed
+    if jobs.enqueue(filepath, mode, actions, modes[mode].get("priority", 0), duration):
+        logging.info(f"Queued {file} | Mode: {mode}")
+
+def dispatch_jobs(config, jobs, workers):
+    """Starts pending jobs, best first, while their mode and the global limit have free slots."""
+    modes = config.get("modes", {})
+    max_jobs = config.get("general", {}).get("max_concurrent_jobs")
+
+    for job in jobs.pending():
+        if max_jobs and len(workers.in_flight) >= max_jobs:
+            return
+        mode_config = modes.get(job["mode"])
+        if mode_config is None:
+            # Mode was removed from config.json; leave the job until it comes back or is requeued
+            continue
+        concurrency = max(1, int(mode_config.get("concurrency", 1)))
+        if workers.running.get(job["mode"], 0) >= concurrency:
+            continue
+        try:
+            # The file is marked processed in this state, even if it changes while the job runs
+            st = os.stat(job["path"])
+        except OSError:
+            jobs.finish(job["id"], False, "File not found")
+            continue
+        jobs.start(job["id"])
+        workers.submit(job["id"], job["path"], job["mode"], json.loads(job["actions"]), concurrency, st)
 
 def monitor():
+    # Fail at startup rather than on every job; the client is then shared by all jobs
+    try:
+        main.get_client()
+    except RuntimeError as e:
+        logging.error(e)
+        sys.exit(1)
     logging.info("Monitoring for new files...")
+    watcher = None
+    workers = WorkerPool()
+    jobs = JobQueue(QUEUE_DB)
+    processed = None
+    gate = StabilityGate()
+    # Jobs that were running when the monitor stopped start over (their journals let them resume)
+    jobs.recover()
 
     while True:
         try:
@@ -110,55 +266,60 @@ def monitor():
                 time.sleep(POLL_INTERVAL)
                 continue
 
-            processed_files = load_processed_files()
-            python_interpreter = config.get("general", {}).get("python_interpreter", "python3")
-            
             # Validation of watch paths
             watch_paths = []
             for entry in config.get("watch_paths", []):
                 directory = entry.get("path")
                 if os.path.exists(directory):
-                     watch_paths.append(entry)
+                     watch_paths.append(directory)
                 # We skip noisy logging here since it runs every loop
             
             if not watch_paths:
                 logging.error("No valid watch directories found.")
                 time.sleep(POLL_INTERVAL)
                 continue
-                
-            for entry in watch_paths:
-                directory = entry["path"]
-                
-                for root, dirs, files in os.walk(directory):
-                    # 1. Prevent recursion: Do not walk into Transcriptions folders
-                    if "Transcriptions" in dirs:
-                        dirs.remove("Transcriptions")
-
-                    for file in files:
-                        filepath = os.path.join(root, file)
-                        ext = os.path.splitext(file)[1].lower()
-                        
-                        # 2. Skip generated intermediate files if they sit in the root for some reason
-                        if "_compressed" in file or "_part" in file:
-                            continue
-
-                        if ext in [".mp3", ".m4a", ".wav", ".flac"]:
-                             # Determine if we should process it
-                             mode, actions = determine_mode_and_actions(file, config.get("modes", {}))
-                             
-                             if mode and file not in processed_files and os.path.getsize(filepath) > 0:
-                                 # Found a matching mode and file is not processed
-                                 try:
-                                     process_file(filepath, mode, actions, python_interpreter)
-                                     processed_files.add(file)
-                                 except Exception as e:
-                                     logging.error(f"Error processing {file}: {e}")
-                                     # Optionally add to processed_files anyway to avoid infinite retry loop, 
-                                     # but for now let's let it retry next scan unless we want to skip it.
-                                     # For now, just continue to the next file in THIS scan.
-                                     pass
-            
-            time.sleep(POLL_INTERVAL)
+
+            # (Re)start the watcher when the set of watched directories changes
+            backend = config.get("general", {}).get("watch_backend", "auto")
+            if watcher is None or watcher.paths != watch_paths:
+                if watcher:
+                    watcher.stop()
+                watcher = FileWatcher(watch_paths, backend=backend, poll_interval=POLL_INTERVAL)
+
+            stability = config.get("general", {}).get("stability", {})
+            gate.stable_seconds = stability.get("stable_seconds", 30)
+            gate.lock_suffixes = stability.get("lock_suffixes", [])
+
+            # Wake up sooner while jobs run or files settle, so nothing waits a full poll interval
+            candidates = watcher.poll(timeout=1 if workers.in_flight or gate else None)
+
+            if processed is None:
+                processed = ProcessedStore(
+                    PROCESSED_DB,
+                    check_hash=config.get("general", {}).get("processed_check_hash", False),
+                    legacy_log=PROCESSED_LOG,
+                )
+
+            for job_id, filepath, st, error in workers.drain_completed():
+                jobs.finish(job_id, error is None, str(error) if error else None)
+                if not error:
+                    try:
+                        processed.mark(filepath, st=st)
+                    except OSError as e:
+                        # Moved or deleted while it was processed; the outputs are written already
+                        logging.warning(f"Could not mark {filepath} as processed: {e}")
+                else:
+                    # Let it retry on the next full scan instead of marking it processed
+                    watcher.retry_later(filepath)
+
+            # Files that need processing wait in the stability gate until they are completely written
+            for filepath in candidates:
+                if is_candidate(filepath, config, processed):
+                    gate.add(filepath)
+            for filepath in sorted(gate.ready()):
+                handle_candidate(filepath, config, processed, jobs)
+
+            dispatch_jobs(config, jobs, workers)
             
         except Exception as e:
             logging.error(f"Error in monitor loop: {e}")
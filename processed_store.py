@@ -0,0 +1,128 @@
+import os
+import time
+import sqlite3
+from contextlib import contextmanager
+
+from result_cache import hash_file
+
+DEFAULT_PATH = "processed_files.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT,
+    processed_at REAL NOT NULL
+)
+"""
+
+_LEGACY_SCHEMA = "CREATE TABLE IF NOT EXISTS legacy_names (name TEXT PRIMARY KEY)"
+
+_META_SCHEMA = "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)"
+
+
+class ProcessedStore:
+    """Remembers which files the monitor has processed, in an indexed SQLite table.
+
+    Files are keyed by absolute path, so equally named files in different folders
+    are tracked separately. A file counts as processed only while its size and
+    mtime match what was recorded; a re-exported file is processed again. With
+    check_hash, a file whose size or mtime changed but whose content hash is the
+    same (e.g. copied back from a backup) still counts as processed.
+
+    Every lookup is a single primary key query, so its cost does not grow with the
+    history. Names from the old processed_files.log are imported once and still
+    match by basename, but only for files last modified before the import; a new
+    file that happens to share an old name is processed normally.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, check_hash=False, legacy_log=None):
+        self.path = path
+        self.check_hash = check_hash
+        with self._connect() as db:
+            db.execute(_SCHEMA)
+            db.execute(_LEGACY_SCHEMA)
+            db.execute(_META_SCHEMA)
+        if legacy_log and os.path.exists(legacy_log):
+            self._import_legacy(legacy_log)
+        self.legacy_imported_at = self._legacy_imported_at()
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation; workers mark files from their own threads
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _import_legacy(self, legacy_log):
+        with open(legacy_log, "r") as f:
+            names = [(line.strip(),) for line in f if line.strip()]
+        with self._connect() as db:
+            db.executemany("INSERT OR IGNORE INTO legacy_names (name) VALUES (?)", names)
+            db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_imported_at', ?)", (time.time(),)
+            )
+        # Imported; rename it so it is not read again
+        os.replace(legacy_log, f"{legacy_log}.imported")
+
+    def _legacy_imported_at(self):
+        with self._connect() as db:
+            row = db.execute("SELECT value FROM meta WHERE key = 'legacy_imported_at'").fetchone()
+            if row is None and db.execute("SELECT 1 FROM legacy_names LIMIT 1").fetchone():
+                # Names imported before the time was recorded; treat them as imported now
+                row = (time.time(),)
+                db.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported_at', ?)", row)
+        return row[0] if row else None
+
+    def is_processed(self, filepath):
+        filepath = os.path.abspath(filepath)
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return False
+
+        with self._connect() as db:
+            row = db.execute("SELECT size, mtime_ns, sha256 FROM processed WHERE path = ?", (filepath,)).fetchone()
+            if row is None:
+                # Old names only cover files that existed when they were imported
+                if self.legacy_imported_at is None or st.st_mtime >= self.legacy_imported_at:
+                    return False
+                legacy = db.execute(
+                    "SELECT 1 FROM legacy_names WHERE name = ?", (os.path.basename(filepath),)
+                ).fetchone()
+                if not legacy:
+                    return False
+
+        if row is None:
+            # Processed by an older version; from now on track it by path
+            self.mark(filepath)
+            return True
+
+        size, mtime_ns, sha256 = row
+        if (size, mtime_ns) == (st.st_size, st.st_mtime_ns):
+            return True
+        if self.check_hash and sha256 and hash_file(filepath) == sha256:
+            self.mark(filepath, sha256)
+            return True
+        return False
+
+    def mark(self, filepath, sha256=None, st=None):
+        """Records filepath as processed in its current state, or in the state st (an os.stat result).
+
+        Pass the stat taken when processing started, so a file re-exported while it
+        was being processed still counts as changed. Raises OSError if the file is gone.
+        """
+        filepath = os.path.abspath(filepath)
+        current = os.stat(filepath)
+        st = st or current
+        if self.check_hash and sha256 is None and (st.st_size, st.st_mtime_ns) == (current.st_size, current.st_mtime_ns):
+            sha256 = hash_file(filepath)
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO processed (path, size, mtime_ns, sha256, processed_at) VALUES (?, ?, ?, ?, ?)",
+                (filepath, st.st_size, st.st_mtime_ns, sha256, time.time()),
+            )
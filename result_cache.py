@@ -0,0 +1,117 @@
+import os
+import hashlib
+import threading
+
+# Size of the blocks used when hashing input files, so large audio never has to fit in memory
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_file(path):
+    """Returns the sha256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """On-disk cache of model responses with size-based LRU eviction.
+
+    Entries are keyed by a hash of the input bytes, the fully rendered prompt and
+    the model name. Each entry is a single text file; its mtime is refreshed on
+    every hit, so the oldest mtime is the least recently used entry.
+    """
+
+    def __init__(self, directory, max_size_mb=500, enabled=True):
+        self.directory = directory
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+
+    def make_key(self, input_path, prompt, model_name, input_id=None):
+        """Key for a request. input_id, if given, identifies the input instead of hashing input_path.
+
+        Derived inputs (e.g. an audio chunk) pass an id built from their source file's
+        hash and how they are made from it, so a lookup needs no file to be created first.
+        """
+        digest = hashlib.sha256()
+        for part in (input_id or hash_file(input_path), prompt, model_name):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, f"{key}.txt")
+
+    def get(self, key):
+        """Returns the cached text for key, or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)  # Mark as recently used
+            return text
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"Warning: Could not read cache entry {path}: {e}")
+            return None
+
+    def put(self, key, text):
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write cache entry {path}: {e}")
+            return
+        self._evict()
+
+    def _evict(self):
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(".txt"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+def cache_from_config(config, base_dir):
+    """Builds a ResultCache from the general.cache section of config.json."""
+    settings = config.get("general", {}).get("cache", {})
+    directory = settings.get("dir", "cache")
+    if not os.path.isabs(directory):
+        directory = os.path.join(base_dir, directory)
+    return ResultCache(
+        directory,
+        max_size_mb=settings.get("max_size_mb", 500),
+        enabled=settings.get("enabled", True),
+    )
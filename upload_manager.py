@@ -0,0 +1,157 @@
+import os
+import json
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from result_cache import hash_file
+
+# Don't reuse a remote file that expires within this window; it may vanish mid-request
+EXPIRY_MARGIN = timedelta(hours=1)
+
+# Hashes uploaded by the job running in the current context (see UploadManager.job)
+_current_job = contextvars.ContextVar("upload_job", default=None)
+
+
+class UploadManager:
+    """Uploads each distinct file to the Gemini Files API only once.
+
+    Uploads are deduplicated by content hash: concurrent requests for the same bytes
+    wait for a single upload, and the remote handle is remembered in a registry file
+    so later runs can reuse it while it is still valid on the server.
+
+    Remote files uploaded while a job() block is active are deleted when the job
+    completes successfully, unless another running job still uses them. Files from
+    failed jobs are kept so the retry can reuse them; the Files API expires them
+    after 48 hours either way.
+    """
+
+    def __init__(self, client, registry_path, executor=None):
+        self.client = client
+        self.registry_path = registry_path
+        # Optional RequestExecutor that adds retries and rate limiting to every API call
+        self.executor = executor
+        self._lock = threading.Lock()
+        self._hash_locks = {}
+        self._handles = {}      # sha256 -> File, uploaded or verified by this process
+        self._active_jobs = {}  # job key -> set of hashes, one per running job
+        self._registry = self._load_registry()
+
+    def _load_registry(self):
+        try:
+            with open(self.registry_path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Could not read upload registry {self.registry_path}: {e}")
+            return {}
+
+    def _save_registry(self):
+        # Called with self._lock held
+        tmp_path = f"{self.registry_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self._registry, f, indent=2)
+            os.replace(tmp_path, self.registry_path)
+        except OSError as e:
+            print(f"Warning: Could not write upload registry {self.registry_path}: {e}")
+
+    def _call(self, fn, *args, **kwargs):
+        if self.executor:
+            return self.executor.call(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    def _lock_for(self, digest):
+        with self._lock:
+            return self._hash_locks.setdefault(digest, threading.Lock())
+
+    def _is_fresh(self, expiration_time):
+        if not expiration_time:
+            return True
+        if isinstance(expiration_time, str):
+            expiration_time = datetime.fromisoformat(expiration_time)
+        return expiration_time - datetime.now(timezone.utc) > EXPIRY_MARGIN
+
+    def _reuse_from_registry(self, digest):
+        entry = self._registry.get(digest)
+        if not entry or not self._is_fresh(entry.get("expiration_time")):
+            return None
+        try:
+            remote_file = self._call(self.client.files.get, name=entry["name"])
+        except Exception:
+            return None
+        state = getattr(getattr(remote_file, "state", None), "name", None)
+        if state not in (None, "ACTIVE", "PROCESSING"):
+            return None
+        return remote_file
+
+    def upload(self, path):
+        """Returns a remote file handle for path, uploading it only if needed."""
+        digest = hash_file(path)
+        job = _current_job.get()
+        if job is not None:
+            job.add(digest)
+
+        with self._lock_for(digest):
+            remote_file = self._handles.get(digest)
+            if remote_file is not None and self._is_fresh(getattr(remote_file, "expiration_time", None)):
+                print(f"Reusing uploaded file for {path}")
+                return remote_file
+
+            remote_file = self._reuse_from_registry(digest)
+            if remote_file is not None:
+                print(f"Reusing uploaded file for {path} from a previous run")
+            else:
+                print(f"Uploading file {path}...")
+                remote_file = self._call(self.client.files.upload, file=path)
+
+            expiration_time = getattr(remote_file, "expiration_time", None)
+            with self._lock:
+                self._handles[digest] = remote_file
+                self._registry[digest] = {
+                    "name": remote_file.name,
+                    "expiration_time": expiration_time.isoformat() if expiration_time else None,
+                }
+                self._save_registry()
+            return remote_file
+
+    def delete(self, digests):
+        """Deletes the remote files for the given content hashes."""
+        for digest in digests:
+            with self._lock_for(digest):
+                with self._lock:
+                    self._handles.pop(digest, None)
+                    entry = self._registry.pop(digest, None)
+                    self._save_registry()
+                if not entry:
+                    continue
+                try:
+                    self._call(self.client.files.delete, name=entry["name"])
+                except Exception as e:
+                    print(f"Warning: Could not delete uploaded file {entry['name']}: {e}")
+
+    @contextmanager
+    def job(self):
+        """Tracks the uploads made inside the block and deletes them when it succeeds.
+
+        Worker threads started inside the block must run in a copy of the caller's
+        context (contextvars.copy_context()) for their uploads to be tracked.
+        """
+        digests = set()
+        job_key = object()
+        token = _current_job.set(digests)
+        with self._lock:
+            self._active_jobs[job_key] = digests
+        succeeded = False
+        try:
+            yield
+            succeeded = True
+        finally:
+            _current_job.reset(token)
+            with self._lock:
+                del self._active_jobs[job_key]
+                still_used = set().union(*self._active_jobs.values())
+            if succeeded:
+                self.delete(digests - still_used)
@@ -0,0 +1,221 @@
+import os
+import time
+import queue
+import logging
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # watchdog is optional; fall back to the indexed scanner
+    Observer = None
+    FileSystemEventHandler = object
+
+# Generated output lives in these folders; never watch or scan them
+SKIP_DIRS = {"Transcriptions"}
+
+# Full rescan interval when filesystem events are available, as a safety net for missed events
+RESCAN_INTERVAL = 300  # Seconds
+
+
+def _in_skipped_dir(path):
+    return any(part in SKIP_DIRS for part in path.split(os.sep))
+
+
+class DirectoryIndex:
+    """Incremental scanner that remembers what it has already seen.
+
+    Directories are keyed by (inode, mtime). A directory whose key has not changed
+    since the last scan cannot contain new or renamed entries, so its listing is
+    skipped; its known files are only stat'd (a file rewritten in place does not
+    change the directory) and its known subdirectories visited. Files are keyed by
+    (inode, mtime, size) and reported only when they are new or have changed.
+    Reported files are re-checked on the following scans until they stop changing,
+    which catches files that keep growing after they first appear.
+    """
+
+    def __init__(self):
+        self._dirs = {}      # dir path -> ((inode, mtime), [subdir paths], [file paths])
+        self._files = {}     # file path -> (inode, mtime, size)
+        self._unsettled = set()
+
+    def scan(self, roots):
+        """Returns the files under roots that are new or changed since the previous scan."""
+        changed = []
+        visited = set()
+        for root in roots:
+            self._scan_dir(root, changed, visited)
+
+        # Forget directories (and their files) that disappeared
+        for path in [p for p in self._dirs if p not in visited]:
+            del self._dirs[path]
+        for path in [p for p in self._files if os.path.dirname(p) not in visited]:
+            del self._files[path]
+            self._unsettled.discard(path)
+
+        reported = set(changed)
+        for path in list(self._unsettled):
+            if path in reported:
+                continue
+            key = self._stat_file(path)
+            if key is None:
+                self._files.pop(path, None)
+                self._unsettled.discard(path)
+            elif key != self._files.get(path):
+                self._files[path] = key
+                changed.append(path)
+            else:
+                self._unsettled.discard(path)
+
+        self._unsettled.update(reported)
+        return changed
+
+    def forget(self, path):
+        """Drops a file from the index so the next scan reports it again."""
+        self._files.pop(path, None)
+        self._unsettled.discard(path)
+        parent = os.path.dirname(path)
+        if parent in self._dirs:
+            # Force the parent directory to be listed again on the next scan
+            self._dirs[parent] = (None,) + self._dirs[parent][1:]
+
+    def _stat_file(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _scan_dir(self, path, changed, visited):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        visited.add(path)
+        dir_key = (st.st_ino, st.st_mtime_ns)
+
+        cached = self._dirs.get(path)
+        if cached and cached[0] == dir_key:
+            subdirs = cached[1]
+            for file_path in cached[2]:
+                file_key = self._stat_file(file_path)
+                if file_key is not None and self._files.get(file_path) != file_key:
+                    self._files[file_path] = file_key
+                    changed.append(file_path)
+        else:
+            subdirs = []
+            files = []
+            try:
+                entries = list(os.scandir(path))
+            except OSError as e:
+                logging.warning(f"Could not list {path}: {e}")
+                return
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS:
+                            subdirs.append(entry.path)
+                        continue
+                    file_st = entry.stat()
+                except OSError:
+                    continue
+                files.append(entry.path)
+                file_key = (file_st.st_ino, file_st.st_mtime_ns, file_st.st_size)
+                if self._files.get(entry.path) != file_key:
+                    self._files[entry.path] = file_key
+                    changed.append(entry.path)
+            self._dirs[path] = (dir_key, subdirs, files)
+
+        for subdir in subdirs:
+            self._scan_dir(subdir, changed, visited)
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, events):
+        self._events = events
+
+    def _push(self, path):
+        if path and not _in_skipped_dir(path):
+            self._events.put(path)
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._push(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._push(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._push(event.dest_path)
+
+
+class FileWatcher:
+    """Reports new or changed files under a set of directories.
+
+    Uses native filesystem events (inotify, FSEvents, ...) through watchdog when it
+    is installed and the backend is "auto", so idle cost is close to zero and new
+    files are seen within a fraction of a second. Otherwise it falls back to
+    DirectoryIndex scans every poll_interval seconds.
+    """
+
+    def __init__(self, paths, backend="auto", poll_interval=10):
+        self.paths = list(paths)
+        self.poll_interval = poll_interval
+        self._index = DirectoryIndex()
+        self._events = queue.Queue()
+        self._observer = None
+        self._next_scan = 0  # Scan everything on the first poll
+
+        if backend == "auto" and Observer is not None:
+            observer = Observer()
+            handler = _EventHandler(self._events)
+            for path in self.paths:
+                observer.schedule(handler, path, recursive=True)
+            observer.start()
+            self._observer = observer
+            logging.info("Watching for filesystem events.")
+        else:
+            if backend == "auto":
+                logging.info("watchdog is not installed; falling back to polling.")
+            logging.info(f"Polling watch directories every {poll_interval} seconds.")
+
+    def poll(self, timeout=None):
+        """Blocks for up to timeout seconds and returns the set of paths that need a look."""
+        if timeout is None:
+            timeout = self.poll_interval
+        now = time.monotonic()
+
+        if now >= self._next_scan:
+            interval = RESCAN_INTERVAL if self._observer else self.poll_interval
+            self._next_scan = now + interval
+            return set(self._index.scan(self.paths))
+
+        wait = min(timeout, self._next_scan - now)
+        if not self._observer:
+            time.sleep(wait)
+            return set()
+
+        paths = set()
+        try:
+            paths.add(self._events.get(timeout=wait))
+            # Collect the burst of events a single file write usually produces
+            deadline = time.monotonic() + 0.5
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                paths.add(self._events.get(timeout=remaining))
+        except queue.Empty:
+            pass
+        return paths
+
+    def retry_later(self, path):
+        """Makes the next full scan report path again, e.g. after processing failed."""
+        self._index.forget(path)
+
+    def stop(self):
+        if self._observer:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None